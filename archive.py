@@ -0,0 +1,147 @@
+"""Moves settled rounds past the retention window out of the live database into monthly archive files.
+
+Each month's rounds and bets go to `<DATABASE_DIR>/archive/rounds-YYYY-MM.db`, a plain SQLite file with
+the same columns, and their totals are added to `archived_months` and `archived_gambler_months` in the
+live database. Lifetime figures (round count, gambler statistics, total wagered) keep counting them.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import database
+from database import ArchivedMonth, ArchivedGamblerMonth, Bet, Round, STATS_COUNTERS
+
+ARCHIVE_DIR = os.path.join(database.VOLUME_DIR, "archive")
+ARCHIVE_RETENTION = timedelta(days=int(os.getenv("ARCHIVE_RETENTION_DAYS", "30")))
+ARCHIVE_BATCH = 500  # Rounds moved per transaction, the database thread is free again between batches
+ARCHIVE_INTERVAL = 6 * 60 * 60  # Seconds between archival runs
+
+MONTH_COLUMNS = ["rounds", "red_rounds", "green_rounds", "black_rounds", "bets", "wagered", "net_profit"]
+ARCHIVER_TASK: asyncio.Task = None
+
+def archive_path(month: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f"rounds-{month}.db")
+
+def prepare_archive_table(connection, table: str):
+    """Create the archived copy of a live table, or add the columns the live table gained since."""
+    columns = [(row[1], row[2]) for row in connection.exec_driver_sql(f"PRAGMA main.table_info({table})")]
+    archived = {row[1] for row in connection.exec_driver_sql(f"PRAGMA archive.table_info({table})")}
+    if not archived:
+        definitions = ", ".join(f"{name} {column_type}" for name, column_type in columns)
+        connection.exec_driver_sql(f"CREATE TABLE archive.{table} ({definitions}, PRIMARY KEY (id))")
+        return [name for name, _ in columns]
+    for name, column_type in columns:
+        if name not in archived:
+            connection.exec_driver_sql(f"ALTER TABLE archive.{table} ADD COLUMN {name} {column_type}")
+    return [name for name, _ in columns]
+
+def add_totals(connection, model, keys: list[str], columns: list[str], rows: list[dict]):
+    """Add the rows' counters onto the summary table, creating the missing rows."""
+    if not rows:
+        return
+    table = model.__table__
+    statement = sqlite_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c[key] for key in keys],
+        set_={column: table.c[column] + statement.excluded[column] for column in columns},
+    )
+    connection.execute(statement, rows)
+
+def archive_batch(cutoff: datetime = None, limit: int = ARCHIVE_BATCH) -> int:
+    """Archive up to `limit` of the oldest settled rounds played before `cutoff`, all from the same month.
+
+    Returns the number of rounds archived, 0 once there is nothing left to archive.
+    """
+    cutoff = cutoff or datetime.now(timezone.utc).replace(tzinfo=None) - ARCHIVE_RETENTION
+    with database.engine.connect() as connection:
+        oldest = connection.execute(
+            select(Round.timestamp).where(Round.settled == True, Round.timestamp < cutoff).order_by(Round.timestamp).limit(1)
+        ).scalar()
+        if oldest is None:
+            return 0
+        month = oldest.strftime("%Y-%m")
+        month_end = (oldest.replace(day=1, hour=0, minute=0, second=0, microsecond=0) + timedelta(days=32)).replace(day=1)
+        rounds = connection.execute(
+            select(Round.id, Round.result_color)
+            .where(Round.settled == True, Round.timestamp < min(cutoff, month_end))
+            .order_by(Round.timestamp)
+            .limit(limit)
+        ).all()
+        round_ids = [round_row.id for round_row in rounds]
+        bets = connection.execute(
+            select(Bet.gambler_id, Bet.amount, Bet.bet_on, Bet.is_correct).where(Bet.round_id.in_(round_ids))
+        ).all()
+        connection.rollback()  # ATTACH is not allowed inside a transaction
+
+        month_totals = {column: 0 for column in MONTH_COLUMNS}
+        month_totals["rounds"] = len(rounds)
+        for round_row in rounds:
+            color = database.STATS_COLORS.get(round_row.result_color)
+            if color:
+                month_totals[f"{color}_rounds"] += 1
+        month_totals["bets"] = len(bets)
+        month_totals["wagered"] = sum(bet.amount for bet in bets)
+        gambler_totals = []
+        for row in database.round_stats(bets).values():
+            month_totals["net_profit"] += row["net_profit"]
+            gambler_totals.append({"month": month, "gambler_id": row["gambler_id"], **{column: row[column] for column in STATS_COUNTERS}})
+
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        connection.exec_driver_sql("ATTACH DATABASE ? AS archive", (archive_path(month),))
+        try:
+            placeholders = ", ".join("?" for _ in round_ids)
+            for table, key in (("rounds", "id"), ("bets", "round_id")):
+                columns = ", ".join(prepare_archive_table(connection, table))
+                # A batch whose archive copy was written but whose live rows survived a crash is copied again harmlessly
+                connection.exec_driver_sql(
+                    f"INSERT OR IGNORE INTO archive.{table} ({columns}) SELECT {columns} FROM main.{table} WHERE {key} IN ({placeholders})",
+                    tuple(round_ids),
+                )
+            connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS archive.ix_bets_gambler_id ON bets (gambler_id)")
+
+            add_totals(connection, ArchivedMonth, ["month"], MONTH_COLUMNS, [{"month": month, "path": archive_path(month), **month_totals}])
+            add_totals(connection, ArchivedGamblerMonth, ["month", "gambler_id"], STATS_COUNTERS, gambler_totals)
+            connection.execute(delete(Bet).where(Bet.round_id.in_(round_ids)))
+            deleted = connection.execute(delete(Round).where(Round.id.in_(round_ids))).rowcount
+            if deleted != len(round_ids):
+                # Another shard archived these rounds since they were read, its totals already count them
+                connection.rollback()
+                print(f"Rounds of {month} were archived by another process, skipping the batch")
+                return 0
+            connection.commit()
+        except Exception as e:
+            connection.rollback()
+            print(f"Error archiving rounds of {month}: {e}")
+            raise
+        finally:
+            connection.exec_driver_sql("DETACH DATABASE archive")
+    print(f"Archived {len(rounds)} rounds and {len(bets)} bets of {month}")
+    return len(rounds)
+
+def get_archived_months() -> list[ArchivedMonth]:
+    return database.session.query(ArchivedMonth).order_by(ArchivedMonth.month).all()
+
+async def archive_rounds(cutoff: datetime = None) -> int:
+    """Archive every settled round played before `cutoff`, one batch per database call."""
+    archived = 0
+    while True:
+        count = await database.run(archive_batch, cutoff)
+        if not count:
+            return archived
+        archived += count
+
+async def archive_loop(interval: float = ARCHIVE_INTERVAL):
+    while True:
+        try:
+            await archive_rounds()
+        except Exception as e:
+            print(f"Error archiving rounds: {e}")
+        await asyncio.sleep(interval)
+
+def start_archiver():
+    global ARCHIVER_TASK
+    if ARCHIVER_TASK is None or ARCHIVER_TASK.done():
+        ARCHIVER_TASK = asyncio.create_task(archive_loop())
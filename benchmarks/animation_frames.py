@@ -0,0 +1,67 @@
+"""Per-frame cost of the spin animation: frames computed on every spin vs looked up in game.SPIN_PLANS.
+
+    python benchmarks/animation_frames.py --spins 2000
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game
+from emojis import Emoji
+
+
+def computed_frames(last_result: int, result: int, extra_rotations: int) -> list:
+    """The frames as animate_roulette used to compute them on every spin."""
+    sequence = game.ROULETTE_SEQUENCE
+    sequence_length = len(sequence)
+    start_index = sequence.index(last_result)
+    final_index = sequence.index(result)
+    forward_distance = (final_index - start_index) % sequence_length
+    total_distance = forward_distance + (sequence_length * extra_rotations)
+
+    def easing(t, total_frames):
+        t /= total_frames
+        return 1 - (1 - t) ** 2
+
+    positions = []
+    for frame in range(game.TOTAL_FRAMES):
+        progress = easing(frame, game.TOTAL_FRAMES)
+        positions.append(round(start_index + progress * total_distance) % sequence_length)
+    positions[-1] = final_index
+
+    frames = []
+    for frame, position in enumerate(positions):
+        if frame % game.FRAME_RATE == 0 or frame == len(positions) - 1:
+            window = game.set_sequence(sequence[position])
+            frames.append(" ".join([Emoji.roulette_values.get(num) for num in window]))
+        else:
+            frames.append(None)
+    return frames
+
+
+def planned_frames(last_result: int, result: int, extra_rotations: int) -> tuple:
+    return game.SPIN_PLANS[(last_result, result, extra_rotations)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spins", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    spins = [(rng.choice(game.ROULETTE_SEQUENCE), rng.choice(game.ROULETTE_SEQUENCE), rng.choice(game.EXTRA_ROTATIONS)) for _ in range(args.spins)]
+    for spin in spins:
+        assert list(planned_frames(*spin)) == computed_frames(*spin), f"Plan of {spin} differs from the computed frames"
+
+    frames = args.spins * game.TOTAL_FRAMES
+    for label, function in (("computed", computed_frames), ("planned", planned_frames)):
+        seconds = min(timeit.repeat(lambda: [function(*spin) for spin in spins], number=1, repeat=5))
+        print(f"{label:>9}: {seconds/frames*1e9:8.1f} ns/frame  ({seconds/args.spins*1e6:.1f} us/spin)")
+
+
+if __name__ == "__main__":
+    main()
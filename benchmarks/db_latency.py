@@ -0,0 +1,89 @@
+"""Interaction latency under concurrent bet clicks, with queries run on the event loop vs on the database thread.
+
+    python benchmarks/db_latency.py --gamblers 300 --history 200
+
+Runs against a scratch database in a temporary directory.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_DIR", tempfile.mkdtemp(prefix="roulette-bench-"))
+
+import database
+import game
+from betbook import RoundBook
+
+
+def seed(gamblers: int, history: int):
+    for gambler_id in range(gamblers):
+        database.create_gambler(gambler_id, f"gambler{gambler_id}", balance=history*10)
+    for _ in range(history):
+        current_round = database.create_round(game.getNewRoundID(), random.randint(0, 14))
+        book = RoundBook(current_round.id, current_round.result_color)
+        for gambler_id in range(gamblers):
+            book.place(gambler_id, f"gambler{gambler_id}", 1, game.Results.RED, history*10)
+        book.seal()
+        database.create_bets(book)
+    database.session.remove()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered)-1, int(len(ordered)*pct/100))]
+
+
+async def click(gambler_id: int, offloaded: bool) -> float:
+    started = time.perf_counter()
+    if offloaded:
+        await database.run(database.get_gambler_by_id, gambler_id)
+    else:
+        database.unit_of_work(database.get_gambler_by_id, gambler_id)
+    await asyncio.sleep(0)  # Acknowledging the interaction
+    return time.perf_counter() - started
+
+
+async def heartbeat(lags: list[float], stop: asyncio.Event, interval: float = 0.005):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def scenario(gamblers: int, offloaded: bool) -> dict:
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(0.01)
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(click(gambler_id, offloaded) for gambler_id in range(gamblers)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+    return {
+        "clicks/s": gamblers / elapsed,
+        "p50 ms": statistics.median(latencies)*1000,
+        "p99 ms": percentile(latencies, 99)*1000,
+        "max loop lag ms": max(lags, default=0)*1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gamblers", type=int, default=300, help="Concurrent clicks, one per gambler")
+    parser.add_argument("--history", type=int, default=200, help="Past bets per gambler")
+    args = parser.parse_args()
+
+    seed(args.gamblers, args.history)
+    for label, offloaded in (("on event loop", False), ("database thread", True)):
+        result = asyncio.run(scenario(args.gamblers, offloaded))
+        print(f"{label:>16}: " + "  ".join(f"{key}={value:.1f}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
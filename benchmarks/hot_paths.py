@@ -0,0 +1,244 @@
+"""Per-call cost of the database functions every round goes through, against realistic volumes.
+
+    python benchmarks/hot_paths.py run --gamblers 10000 --rounds 100000 --bets 1000000 --save before.json
+    python benchmarks/hot_paths.py run --data-dir /tmp/hot-paths --baseline before.json
+    python benchmarks/hot_paths.py compare before.json after.json
+
+`run` seeds a scratch database (in a temporary directory, or in --data-dir where a seeded database is
+reused) and times each function the way the bot calls it, as one unit of work. `compare` lines up the
+medians of two saved runs and exits with 1 when one regressed by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_CHUNK = 50000  # Rows inserted per statement while seeding
+STAKES = [0.5, 1, 2, 5, 10]
+COLOR_WEIGHTS = {"RED": 47, "BLACK": 47, "GREEN": 6}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered)-1, int(len(ordered)*pct/100))]
+
+
+# ---------------------------- SEEDING ---------------------------- #
+def seed(database, game, gamblers: int, rounds: int, bets: int, rng: random.Random):
+    """Gamblers, settled rounds 30 seconds apart and their bets, with the statistics settling them would have built."""
+    from sqlalchemy import insert
+    from money import to_money
+
+    started = time.perf_counter()
+    database.session.execute(insert(database.Gambler), [
+        {"id": gambler_id, "name": f"gambler{gambler_id}", "balance": rng.randint(0, 10**5), "total_wagered": 0,
+         "xp": 0, "level": 1, "daily": 10, "default_bet_amount": rng.choice(STAKES)}
+        for gambler_id in range(gamblers)
+    ])
+    database.session.commit()
+
+    colors, weights = zip(*COLOR_WEIGHTS.items())
+    per_round = max(1, min(gamblers, bets // rounds))
+    first = datetime.now() - timedelta(seconds=30 * rounds)
+    round_rows, bet_rows, stats_rows = [], [], []
+    for round_num in range(rounds):
+        result = rng.randint(0, 14)
+        round_id = f"seed-{round_num}"
+        timestamp = first + timedelta(seconds=30 * round_num)
+        round_rows.append({"id": round_id, "result_num": result, "result_color": game.NUMBER_COLOR_MAPPING[result],
+                           "timestamp": timestamp, "settled": True})
+        round_bets = []
+        for gambler_id in rng.sample(range(gamblers), per_round):
+            stake = to_money(rng.choice(STAKES))
+            bet_on = rng.choices(colors, weights)[0]
+            is_correct = bet_on == game.NUMBER_COLOR_MAPPING[result]
+            round_bets.append({"id": f"bet-{round_num}-{gambler_id}", "amount": stake, "bet_on": bet_on, "is_correct": is_correct,
+                               "old_balance": 1000, "new_balance": 1000 - stake + game.payout(stake, bet_on, is_correct),
+                               "timestamp": timestamp, "gambler_id": gambler_id, "round_id": round_id})
+        bet_rows.extend(round_bets)
+        # Statistics as settling builds them, the rows of many rounds per statement are still applied round after round
+        stats_rows.extend(database.round_stats(SimpleNamespace(**bet) for bet in round_bets).values())
+        if len(bet_rows) >= SEED_CHUNK or round_num == rounds - 1:
+            database.session.execute(insert(database.Round), round_rows)
+            database.session.execute(insert(database.Bet), bet_rows)
+            database.upsert_gambler_stats(stats_rows)
+            database.session.commit()
+            round_rows, bet_rows, stats_rows = [], [], []
+            print(f"Seeded {round_num + 1}/{rounds} rounds", end="\r", flush=True)
+    print()
+    database.session.remove()
+    print(f"Seeded {gamblers} gamblers, {rounds} rounds and {rounds * per_round} bets in {time.perf_counter() - started:.0f}s")
+
+
+# ---------------------------- CASES ---------------------------- #
+def cases(database, embed_messages, game, RoundBook, gamblers: int, rounds: int, rng: random.Random) -> dict:
+    """Each case is (prepare, call): prepare runs untimed and returns the arguments of the timed call."""
+    def random_gambler():
+        return rng.randrange(gamblers)
+
+    def random_round():
+        return f"seed-{rng.randrange(rounds)}"
+
+    def new_round():
+        round_id = game.getNewRoundID()
+        database.unit_of_work(database.create_round, round_id, rng.randint(0, 14))
+        return round_id
+
+    def prepare_create_bet():
+        round_id = new_round()
+        return (database.get_gambler_by_id(random_gambler()), database.get_round_by_id(round_id), rng.choice(STAKES), "RED")
+
+    def prepare_process_bets():
+        round_id = new_round()
+        settled_round = database.unit_of_work(database.get_round_by_id, round_id)
+        book = RoundBook(round_id, settled_round.result_color)
+        for gambler_id in rng.sample(range(gamblers), min(gamblers, 50)):
+            book.place(gambler_id, f"gambler{gambler_id}", 1, rng.choice(list(COLOR_WEIGHTS)), 10**6)
+        book.seal()
+        database.unit_of_work(database.create_bets, book)
+        return (round_id,)
+
+    def gambler_statistics(gambler_id):
+        # What the My Stats button does: the gambler with their statistics, then the embed
+        interaction = SimpleNamespace(user=SimpleNamespace(display_name=f"gambler{gambler_id}", avatar=None))
+        return embed_messages.gambler_statistics(interaction, database.get_gambler_by_id(gambler_id))
+
+    return {
+        "get_last_round": (lambda: (), database.get_last_round),
+        "get_last_x_rounds": (lambda: (10,), database.get_last_x_rounds),
+        "get_all_bets_by_round_id": (lambda: (random_round(),), database.get_all_bets_by_round_id),
+        "get_gambler_by_id": (lambda: (random_gambler(),), database.get_gambler_by_id),
+        "create_bet": (prepare_create_bet, database.create_bet),
+        "process_bets": (prepare_process_bets, database.process_bets),
+        "leaderboard": (lambda: (), embed_messages.leaderboard),
+        "gambler_statistics": (lambda: (random_gambler(),), gambler_statistics),
+    }
+
+def measure(database, prepare, call, iterations: int, warmup: int) -> dict:
+    timings = []
+    for iteration in range(warmup + iterations):
+        args = prepare()
+        started = time.perf_counter()
+        database.unit_of_work(call, *args)
+        elapsed = time.perf_counter() - started
+        database.session.remove()  # Prepared objects belong to the session the timed call closed
+        if iteration >= warmup:
+            timings.append(elapsed)
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "mean_ms": statistics.fmean(timings) * 1000,
+        "iterations": iterations,
+    }
+
+def run(args) -> dict:
+    if args.data_dir:
+        os.environ["DATABASE_DIR"] = args.data_dir
+    else:
+        os.environ.setdefault("DATABASE_DIR", tempfile.mkdtemp(prefix="roulette-bench-"))
+    sys.path.insert(0, ROOT)
+    import sqlalchemy
+    import database
+    import embed_messages
+    import game
+    from betbook import RoundBook
+
+    rng = random.Random(args.seed)
+    existing = database.unit_of_work(lambda: database.session.query(database.Gambler).count())
+    if existing:
+        args.gamblers = existing
+        args.rounds = database.unit_of_work(lambda: database.session.query(database.Round).filter(database.Round.id.like("seed-%")).count())
+        print(f"Reusing the database in {database.VOLUME_DIR}: {args.gamblers} gamblers, {args.rounds} seeded rounds")
+    else:
+        seed(database, game, args.gamblers, args.rounds, args.bets, rng)
+    bets = database.unit_of_work(lambda: database.session.query(database.Bet).count())
+
+    results = {}
+    for name, (prepare, call) in cases(database, embed_messages, game, RoundBook, args.gamblers, args.rounds, rng).items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = measure(database, prepare, call, args.iterations, args.warmup)
+        print(f"{name:>24}: " + "  ".join(f"{key}={value:.2f}" for key, value in results[name].items() if key != "iterations"))
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "gamblers": args.gamblers,
+            "rounds": args.rounds,
+            "bets": bets,
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "sqlite": sqlite3.sqlite_version,
+        },
+        "results": results,
+    }
+
+
+# ---------------------------- BASELINES ---------------------------- #
+def compare(baseline: dict, current: dict, threshold: float) -> bool:
+    """Print the medians of both runs side by side. Returns True when a function got slower than `threshold` allows."""
+    for label, report in (("baseline", baseline), ("current", current)):
+        meta = report["meta"]
+        print(f"{label:>8}: {meta['date']}  {meta['gamblers']} gamblers, {meta['rounds']} rounds, {meta['bets']} bets  "
+              f"SQLAlchemy {meta['sqlalchemy']}, SQLite {meta['sqlite']}")
+    regressed = False
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        before, after = baseline["results"].get(name), current["results"].get(name)
+        if before is None or after is None:
+            print(f"{name:>24}: only in the {'current run' if before is None else 'baseline'}")
+            continue
+        change = after["median_ms"] / before["median_ms"] - 1 if before["median_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag, regressed = "  REGRESSED", True
+        print(f"{name:>24}: {before['median_ms']:9.2f} ms -> {after['median_ms']:9.2f} ms  {change:+7.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Seed a database and time the hot paths")
+    run_parser.add_argument("--gamblers", type=int, default=10000)
+    run_parser.add_argument("--rounds", type=int, default=100000, help="Settled rounds in the database")
+    run_parser.add_argument("--bets", type=int, default=1000000, help="Bets over all the rounds")
+    run_parser.add_argument("--iterations", type=int, default=200, help="Timed calls per function")
+    run_parser.add_argument("--warmup", type=int, default=10, help="Untimed calls before those")
+    run_parser.add_argument("--only", nargs="+", help="Time only these functions")
+    run_parser.add_argument("--data-dir", help="Directory of the database, a database seeded by an earlier run is reused")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--save", help="Write the results to this JSON file")
+    run_parser.add_argument("--baseline", help="Compare the results with this JSON file")
+    run_parser.add_argument("--threshold", type=float, default=0.2, help="Median slowdown counted as a regression")
+
+    compare_parser = commands.add_parser("compare", help="Compare two saved runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2, help="Median slowdown counted as a regression")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline) as baseline, open(args.current) as current:
+            sys.exit(1 if compare(json.load(baseline), json.load(current), args.threshold) else 0)
+
+    report = run(args)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Saved to {args.save}")
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            sys.exit(1 if compare(json.load(baseline), report, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""Headless roulette: real tables, buttons and settlement against fake Discord objects and synthetic gamblers.
+
+    python benchmarks/simulator.py --gamblers 200 --rounds 10 --tables 2 --arrival late --seed 1
+
+Each table runs the RouletteTable loop unchanged. Messages record their edits and hold them back like
+Discord's per-channel rate limit does (a 429 and its retry-after, then the edit). Results come from a
+seeded source and every gambler's choices from the seed, so two runs with the same arguments play the
+same rounds; the balance checksum at the end tells whether they did. Game time is scaled by --time-scale,
+a 10 s betting period takes 0.5 s at the default 0.05. Runs against a scratch database in a temporary
+directory.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from collections import deque
+from functools import wraps
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_DIR", tempfile.mkdtemp(prefix="roulette-sim-"))
+
+import database
+import game
+import table
+from results import ResultPool, SeededSource
+from table import RouletteTable, TableManager, BetButton
+
+# When each gambler clicks within the betting period, as a fraction of it drawn from a uniform u
+ARRIVAL_CURVES = {
+    "uniform": lambda u: u,
+    "burst": lambda u: 0.1 * u,  # Everyone right after the round opens
+    "ramp": lambda u: u ** 0.5,  # More and more clicks towards the end
+    "late": lambda u: 1 - 0.15 * u,  # A last second rush
+}
+ARRIVAL_WINDOW = 0.9  # Clicks land in the first 90% of the betting period, the rest is left for their acks
+COLOR_WEIGHTS = {game.Results.RED: 47, game.Results.BLACK: 47, game.Results.GREEN: 6}
+
+
+# ---------------------------- FAKE DISCORD ---------------------------- #
+class ScaledAsyncio():
+    """The asyncio module with every sleep shortened by `scale`, swapped into the modules under test."""
+    def __init__(self, scale: float):
+        self.scale = scale
+
+    def __getattr__(self, name):
+        return getattr(asyncio, name)
+
+    async def sleep(self, delay, result=None):
+        return await asyncio.sleep(delay * self.scale, result)
+
+class RateLimit():
+    """Discord-like bucket: `limit` requests per `window` seconds, later ones wait for the retry-after."""
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.sent = deque()
+        self.limited = 0
+        self.waited = 0.0
+
+    async def acquire(self):
+        while True:
+            now = time.perf_counter()
+            while self.sent and now - self.sent[0] >= self.window:
+                self.sent.popleft()
+            if len(self.sent) < self.limit:
+                self.sent.append(now)
+                return
+            retry_after = self.window - (now - self.sent[0])
+            self.limited += 1
+            self.waited += retry_after
+            await asyncio.sleep(retry_after)
+
+class FakeMessage():
+    ids = itertools.count(1)
+
+    def __init__(self, channel: "FakeChannel", embed=None, view=None):
+        self.id = next(self.ids)
+        self.channel = channel
+        self.embed = embed
+        self.view = view
+        self.edits = 0
+        self.deleted = False
+
+    async def edit(self, embed=None, view=None, **kwargs):
+        await self.channel.rate_limit.acquire()
+        self.embed = embed or self.embed
+        self.view = view or self.view
+        self.edits += 1
+
+    async def delete(self, delay: float = None):
+        self.deleted = True
+
+class FakeChannel():
+    def __init__(self, channel_id: int, rate_limit: RateLimit):
+        self.id = channel_id
+        self.rate_limit = rate_limit
+        self.messages: list[FakeMessage] = []
+
+    async def send(self, embed=None, view=None, **kwargs) -> FakeMessage:
+        await self.rate_limit.acquire()
+        message = FakeMessage(self, embed, view)
+        self.messages.append(message)
+        return message
+
+class FakeBot():
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.channels: dict[int, FakeChannel] = {}
+
+    async def fetch_channel(self, channel_id: int) -> FakeChannel:
+        if channel_id not in self.channels:
+            self.channels[channel_id] = FakeChannel(channel_id, RateLimit(self.limit, self.window))
+        return self.channels[channel_id]
+
+class FakeUser():
+    def __init__(self, user_id: int, name: str):
+        self.id = user_id
+        self.global_name = name
+        self.mention = f"<@{user_id}>"
+
+class FakeResponse():
+    def __init__(self, interaction: "FakeInteraction"):
+        self.interaction = interaction
+        self.content: str = None
+
+    def is_done(self) -> bool:
+        return self.interaction.acked_at is not None
+
+    async def send_message(self, content: str = None, **kwargs):
+        self.interaction.acked_at = time.perf_counter()
+        self.content = content
+
+    async def defer(self, **kwargs):
+        self.interaction.acked_at = time.perf_counter()
+
+class FakeInteraction():
+    def __init__(self, user: FakeUser, channel: FakeChannel):
+        self.user = user
+        self.channel = channel
+        self.channel_id = channel.id
+        self.created_at = time.perf_counter()
+        self.acked_at: float = None
+        self.response = FakeResponse(self)
+
+
+# ---------------------------- GAMBLERS ---------------------------- #
+class Crowd():
+    """Synthetic gamblers clicking the bet buttons of every round that opens."""
+    def __init__(self, gamblers: int, participation: float, arrival: str, seed: int):
+        self.users = [FakeUser(gambler_id, f"sim{gambler_id}") for gambler_id in range(1, gamblers + 1)]
+        self.participation = participation
+        self.curve = ARRIVAL_CURVES[arrival]
+        self.random = random.Random(seed)
+        self.latencies: list[float] = []
+        self.replies: dict[str, int] = {}
+        self.tasks: set[asyncio.Task] = set()
+
+    def round_opened(self, roulette_table: RouletteTable, period: float):
+        """Schedule this round's clicks, `period` being the real length of the betting period."""
+        colors, weights = zip(*COLOR_WEIGHTS.items())
+        for user in self.random.sample(self.users, int(len(self.users) * self.participation)):
+            delay = self.curve(self.random.random()) * ARRIVAL_WINDOW * period
+            color = self.random.choices(colors, weights)[0]
+            task = asyncio.create_task(self.click(roulette_table, user, color, delay))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def click(self, roulette_table: RouletteTable, user: FakeUser, color: str, delay: float):
+        await asyncio.sleep(delay)
+        button = next(item for item in roulette_table.buttons.children if isinstance(item, BetButton) and item.bet_on == color)
+        interaction = FakeInteraction(user, roulette_table.roulette_msg.channel)
+        await button.callback(interaction)
+        if interaction.acked_at is not None:
+            self.latencies.append(interaction.acked_at - interaction.created_at)
+        reply = (interaction.response.content or "").split("**")[0].strip() or "embed"
+        self.replies[reply] = self.replies.get(reply, 0) + 1
+
+class SimulatedTable(RouletteTable):
+    """A RouletteTable that lets the crowd in whenever betting opens and counts its finished rounds."""
+    def __init__(self, *args, crowd: Crowd, time_scale: float, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.crowd = crowd
+        self.time_scale = time_scale
+        self.completed = 0
+
+    def set_button_states(self, state: bool = True):
+        super().set_button_states(state)
+        if state:
+            self.crowd.round_opened(self, self.betting_duration * self.time_scale)
+
+    async def play_round(self, slot: int = None):
+        await super().play_round(slot)
+        self.completed += 1
+
+
+# ---------------------------- HARNESS ---------------------------- #
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered)-1, int(len(ordered)*pct/100))] if ordered else 0.0
+
+def seed_gamblers(gamblers: int, seed: int):
+    rng = random.Random(seed)
+    for gambler_id in range(1, gamblers + 1):
+        database.create_gambler(gambler_id, f"sim{gambler_id}", balance=1000, default_bet_amount=rng.choice([1, 2, 5, 0.5]))
+    database.session.remove()
+
+def time_database(db_time: list[float]):
+    """Count the time every database call spends on the database thread."""
+    run = database.run
+
+    async def timed_run(function, *args, **kwargs):
+        @wraps(function)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                db_time[0] += time.perf_counter() - started
+        return await run(timed, *args, **kwargs)
+    database.run = timed_run
+
+async def simulate(args) -> dict:
+    random.seed(args.seed)
+    source = SeededSource(args.seed)
+    game.RESULT_POOL = ResultPool([], fallback=source)  # No refills, every draw comes from the seeded source in order
+    scaled = ScaledAsyncio(args.time_scale)
+    table.asyncio = scaled
+    game.RENDER_INTERVAL = args.render_interval * args.time_scale  # The renderer times its edits on the loop clock
+    db_time = [0.0]
+    time_database(db_time)
+
+    bot = FakeBot(args.edit_limit, args.edit_window * args.time_scale)
+    crowd = Crowd(args.gamblers, args.participation, args.arrival, args.seed)
+    manager = TableManager(bot, stagger=table.TABLE_STAGGER)
+    for channel_id in range(1, args.tables + 1):
+        manager.tables[channel_id] = SimulatedTable(bot, channel_id, args.betting, args.pause, crowd=crowd, time_scale=args.time_scale)
+
+    started = time.perf_counter()
+    for roulette_table in manager.tables.values():
+        await roulette_table.setup()
+        manager.start(roulette_table.channel_id)
+    while any(roulette_table.completed < args.rounds for roulette_table in manager.tables.values()):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    await manager.close()
+    for task in list(crowd.tasks):
+        task.cancel()
+
+    rounds = sum(roulette_table.completed for roulette_table in manager.tables.values())
+    messages = [message for channel in bot.channels.values() for message in channel.messages]
+    balances = database.unit_of_work(lambda: sorted((gambler.id, str(gambler.balance)) for gambler in database.get_all_gamblers()))
+    return {
+        "rounds": rounds,
+        "rounds/s": rounds / elapsed,
+        "clicks": len(crowd.latencies),
+        "p50 ack ms": statistics.median(crowd.latencies) * 1000 if crowd.latencies else 0.0,
+        "p99 ack ms": percentile(crowd.latencies, 99) * 1000,
+        "edits/round": sum(message.edits for message in messages) / rounds,
+        "429s": sum(channel.rate_limit.limited for channel in bot.channels.values()),
+        "db ms/round": db_time[0] / rounds * 1000,
+        "replies": crowd.replies,
+        "checksum": zlib.crc32(repr(balances).encode()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gamblers", type=int, default=200, help="Synthetic gamblers")
+    parser.add_argument("--participation", type=float, default=0.8, help="Share of the gamblers betting each round")
+    parser.add_argument("--arrival", choices=sorted(ARRIVAL_CURVES), default="uniform", help="When in the betting period they click")
+    parser.add_argument("--rounds", type=int, default=10, help="Rounds played by every table")
+    parser.add_argument("--tables", type=int, default=1, help="Tables played side by side")
+    parser.add_argument("--betting", type=int, default=game.BETTING_DURATION, help="Betting period in game seconds")
+    parser.add_argument("--pause", type=float, default=table.ROUND_PAUSE, help="Pause between rounds in game seconds")
+    parser.add_argument("--time-scale", type=float, default=0.05, help="Real seconds per game second")
+    parser.add_argument("--render-interval", type=float, default=game.RENDER_INTERVAL, help="Game seconds between two edits of a message")
+    parser.add_argument("--edit-limit", type=int, default=5, help="Edits and sends allowed per channel and window")
+    parser.add_argument("--edit-window", type=float, default=5, help="Rate limit window in game seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    seed_gamblers(args.gamblers, args.seed)
+    result = asyncio.run(simulate(args))
+    replies = result.pop("replies")
+    print("  ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}" for key, value in result.items()))
+    print("replies: " + ", ".join(f"{reply} x{count}" for reply, count in sorted(replies.items(), key=lambda item: -item[1])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Round throughput with SQLite defaults and no secondary indexes vs the tuned profile and indexes.
+
+    python benchmarks/sqlite_profile.py --gamblers 200 --history 300 --rounds 50
+
+Each profile runs in its own process against a scratch database in a temporary directory. A round
+places every gambler's bet, settles it and reads what the bot reads after a round.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The indexes the migrations add, dropped to measure the schema as it was
+QUERY_INDEXES = ["ix_bets_round_id", "ix_bets_gambler_id_round_id", "ix_rounds_timestamp", "ix_items_gambler_id"]
+
+
+def play_round(database, game, RoundBook, gamblers: int, settle: bool = True):
+    current_round = database.create_round(game.getNewRoundID(), random.randint(0, 14))
+    book = RoundBook(current_round.id, current_round.result_color)
+    for gambler_id in range(gamblers):
+        book.place(gambler_id, f"gambler{gambler_id}", 1, random.choice(list(game.MULTIPLIERS)), 10**6)
+    book.seal()
+    database.create_bets(book)
+    if settle:
+        database.process_bets(current_round.id)
+        database.get_last_x_rounds(10)
+        database.get_all_bets_by_round_id(current_round.id)
+        database.get_bet_of_gambler_by_round_id(0, current_round.id)
+    database.session.remove()
+
+
+def child(profile: str, gamblers: int, history: int, rounds: int) -> dict:
+    sys.path.insert(0, ROOT)
+    os.environ["SQLITE_PROFILE"] = profile
+    os.environ["DATABASE_DIR"] = tempfile.mkdtemp(prefix="roulette-bench-")
+    import database
+    import game
+    from betbook import RoundBook
+    from sqlalchemy import text
+
+    if profile == "default":
+        with database.engine.begin() as connection:
+            for index in QUERY_INDEXES:
+                connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+
+    random.seed(0)
+    for gambler_id in range(gamblers):
+        database.create_gambler(gambler_id, f"gambler{gambler_id}", balance=10**6)
+    for _ in range(history):
+        play_round(database, game, RoundBook, gamblers, settle=False)
+    database.unit_of_work(database.process_bets)
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        play_round(database, game, RoundBook, gamblers)
+    elapsed = time.perf_counter() - started
+    return {"rounds/s": rounds / elapsed, "ms/round": elapsed / rounds * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gamblers", type=int, default=200, help="Bets per round")
+    parser.add_argument("--history", type=int, default=300, help="Rounds already in the database")
+    parser.add_argument("--rounds", type=int, default=50, help="Rounds measured")
+    parser.add_argument("--child", choices=["default", "tuned"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, args.gamblers, args.history, args.rounds)))
+        return
+
+    for profile in ("default", "tuned"):
+        command = [sys.executable, os.path.abspath(__file__), "--child", profile,
+                   "--gamblers", str(args.gamblers), "--history", str(args.history), "--rounds", str(args.rounds)]
+        output = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{profile:>8}: " + "  ".join(f"{key}={value:.1f}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
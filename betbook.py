@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from decimal import Decimal
+
+import game
+from exceptions import BettingClosedException, DuplicateBetException
+
+TABLE_ROWS = 8  # Rows per color shown in the bets table
+
+@dataclass
+class BookEntry():
+    gambler_id: int
+    name: str
+    amount: Decimal
+    bet_on: str
+    old_balance: Decimal
+
+class RoundBook():
+    """Bets of the round that is currently open, kept in memory until betting closes.
+
+    Opened when a round is created, sealed when the timer runs out and then
+    flushed to the `bets` table in one write by `database.create_bets`.
+    """
+    def __init__(self, round_id: str, result_color: str):
+        self.round_id = round_id
+        self.result_color = result_color
+        self.sealed = False
+        self.entries: dict[int, BookEntry] = {}
+        self.by_color: dict[str, list[BookEntry]] = {game.Results.GREEN: [], game.Results.RED: [], game.Results.BLACK: []}
+        self.totals: dict[str, Decimal] = {color: 0 for color in self.by_color}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f"RoundBook Round={self.round_id}, Bets={len(self.entries)}, Sealed={self.sealed}"
+
+    def get(self, gambler_id: int) -> BookEntry:
+        return self.entries.get(gambler_id)
+
+    def place(self, gambler_id: int, name: str, amount: Decimal, bet_on: str, old_balance: Decimal) -> BookEntry:
+        if self.sealed:
+            raise BettingClosedException("Betting is closed for this round. Wait for the next one!")
+        existing = self.entries.get(gambler_id)
+        if existing:
+            raise DuplicateBetException(f"You have already made your bet on **{existing.bet_on}** with **${existing.amount}**")
+
+        entry = BookEntry(gambler_id=gambler_id, name=name, amount=amount, bet_on=bet_on, old_balance=old_balance)
+        self.entries[gambler_id] = entry
+        self.by_color[bet_on].append(entry)
+        self.totals[bet_on] += amount
+        return entry
+
+    def drop(self, gambler_id: int) -> BookEntry:
+        """Take back a bet that could not be staked, e.g. its balance went to a bet at another table."""
+        entry = self.entries.pop(gambler_id)
+        self.by_color[entry.bet_on].remove(entry)
+        self.totals[entry.bet_on] -= entry.amount
+        return entry
+
+    def seal(self):
+        self.sealed = True
+
+    def table_rows(self, bet_on: str) -> list[BookEntry]:
+        return self.by_color[bet_on][:TABLE_ROWS]
@@ -0,0 +1,162 @@
+import os
+import time
+import random
+import asyncio
+from datetime import datetime
+
+import aiohttp
+import requests
+from dotenv import load_dotenv, set_key
+
+import metrics
+import settings
+from buff_index import BuffIndex
+
+# ---------------------------- BUFF PRICE ---------------------------- #
+RETRY = 4
+HEADERS = settings.buff_headers
+PARAMS = settings.buff_params
+BUFF_URL = "https://buff.163.com"
+LS_PATH = "/api/market/goods/sell_order"
+HB_PATH = "/api/market/goods/buy_order"
+CONCURRENCY = 4  # Requests in flight at once
+RATE_LIMIT = 5  # Requests started per second
+TIMEOUT = 5
+
+# Goods ids by market hash name, looked up in the compiled index on first use
+ITEM_IDS = BuffIndex()
+
+def getCNY_USD() -> float:
+        load_dotenv()
+        f = os.getenv("YUANUSD")
+        rate, date = f.split(",")
+
+        dt_object = datetime.strptime(date, "%d/%m/%Y")
+        if dt_object < datetime.now():
+            try:
+                url = "https://api.exchangerate-api.com/v4/latest/CNY"
+                response = requests.get(url, timeout=TIMEOUT)
+                data = response.json()
+                rate = float(data["rates"]["USD"])
+                formatted_date = datetime.now().strftime("%d/%m/%Y")
+                set_key(".env", "YUANUSD", f"{str(rate)},{formatted_date}")
+            except Exception as e:
+                print(e)
+        return float(rate)
+YUANUSD = getCNY_USD()
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+class BuffPriceClient():
+    """Fetches Buff order books over one pooled HTTP session.
+
+    Both order books of an item are fetched concurrently and many items run in parallel, at most
+    `concurrency` requests in flight and `rate_limit` requests started per second. A 429 is retried
+    after its Retry-After (or an exponential backoff with jitter) without blocking the event loop.
+    `base_url` can point at a local stand-in server.
+    """
+    def __init__(self, base_url: str = BUFF_URL, concurrency: int = CONCURRENCY, rate_limit: float = RATE_LIMIT,
+                 retries: int = RETRY, timeout: float = TIMEOUT, headers: dict = None, params: dict = None):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.rate_limit = rate_limit
+        self.retries = retries
+        self.timeout = timeout
+        self.headers = HEADERS if headers is None else headers
+        self.params = PARAMS if params is None else params
+        self.requests = 0
+        self.rate_limited = 0
+
+        self._session: aiohttp.ClientSession = None
+        self._semaphore: asyncio.Semaphore = None
+        self._rate_lock: asyncio.Lock = None
+        self._next_slot = 0
+
+    def __repr__(self):
+        return f"BuffPriceClient URL={self.base_url}, Concurrency={self.concurrency}, Rate={self.rate_limit}/s"
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._rate_lock = asyncio.Lock()
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    async def _wait_for_slot(self):
+        loop = asyncio.get_running_loop()
+        async with self._rate_lock:
+            wait = self._next_slot - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_slot = max(self._next_slot, loop.time()) + 1 / self.rate_limit
+
+    def _backoff(self, attempt: int) -> float:
+        return min(8, 2 ** attempt) * random.uniform(0.5, 1)
+
+    async def _get_orders(self, path: str, goods_id) -> list[dict]:
+        """The order book at `path`, [] when it is empty and None when every attempt failed."""
+        session = self._get_session()
+        params = {**self.params, "goods_id": str(goods_id)}
+        for attempt in range(self.retries):
+            await self._wait_for_slot()
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    started = time.perf_counter()
+                    async with session.get(self.base_url + path, params=params) as response:
+                        if metrics.ENABLED:
+                            metrics.HTTP_REQUESTS.observe(time.perf_counter() - started, "buff", response.status)
+                        if response.status == 429:
+                            retry_after = response.headers.get("Retry-After")
+                            raise RateLimited(float(retry_after) if retry_after else self._backoff(attempt))
+                        response.raise_for_status()
+                        data = await response.json(content_type=None)
+                        return data["data"]["items"]
+            except RateLimited as e:
+                self.rate_limited += 1
+                if metrics.ENABLED:
+                    metrics.HTTP_RATE_LIMITS.inc("buff")
+                print(f"Too many requests for {goods_id}, retrying in {e.retry_after:.1f}s")
+                await asyncio.sleep(e.retry_after)
+            except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, TypeError, ValueError) as e:
+                if metrics.ENABLED and isinstance(e, (aiohttp.ClientConnectionError, asyncio.TimeoutError)):
+                    metrics.HTTP_REQUESTS.observe(time.perf_counter() - started, "buff", "error")
+                print(f"Error fetching {path} of {goods_id}: {e}")
+                await asyncio.sleep(self._backoff(attempt))
+        return None
+
+    async def get_price(self, goods_id) -> tuple[float, float]:
+        """Lowest sell and highest buy price of an item in USD, None where the order book is empty.
+
+        Returns None instead of the pair when an order book could not be fetched, the price is unknown then.
+        """
+        sell_orders, buy_orders = await asyncio.gather(self._get_orders(LS_PATH, goods_id), self._get_orders(HB_PATH, goods_id))
+        if sell_orders is None or buy_orders is None:
+            return None
+        try:
+            lowest_sell = round(float(sell_orders[0].get("price"))*YUANUSD, 2)
+        except Exception:
+            lowest_sell = None
+        try:
+            highest_buy = round(float(buy_orders[0].get("price"))*YUANUSD, 2)
+        except Exception:
+            highest_buy = None
+        return (lowest_sell, highest_buy)
+
+    async def get_prices(self, goods_ids) -> dict:
+        goods_ids = list(dict.fromkeys(goods_ids))
+        prices = await asyncio.gather(*(self.get_price(goods_id) for goods_id in goods_ids))
+        return dict(zip(goods_ids, prices))
+
+PRICE_CLIENT = BuffPriceClient()
@@ -0,0 +1,140 @@
+"""Compiled, memory-mapped index of Buff goods ids by market hash name.
+
+`buffids.txt` ("goods_id;market_hash_name" per line) is compiled once into `buffids.idx`:
+
+    header   magic (8 bytes), entry count (uint32)
+    entries  count x (name offset, name length, goods id) as uint32, sorted by UTF-8 name
+    names    the UTF-8 names back to back
+
+Lookups binary search the mapped file, so nothing is parsed at import and every process shares
+the same pages. Rebuild with `python buff_index.py` after updating `buffids.txt`; a missing or
+outdated index is rebuilt on first use.
+"""
+import mmap
+import os
+import struct
+import sys
+import threading
+
+SOURCE_PATH = "buffids.txt"
+INDEX_PATH = "buffids.idx"
+MAGIC = b"BUFFIDX1"
+HEADER = struct.Struct("<8sI")
+ENTRY = struct.Struct("<III")
+
+def build_index(source: str = SOURCE_PATH, target: str = INDEX_PATH) -> int:
+    """Compile `source` into the binary index at `target`. Returns the number of names."""
+    ids = {}
+    with open(source, "r", encoding="utf8") as f:
+        for line in f:
+            goods_id, _, name = line.rstrip("\n").partition(";")
+            name = name.strip()
+            if name and goods_id.strip().isdigit():
+                ids[name.encode("utf8")] = int(goods_id)
+
+    names = sorted(ids)
+    entries = bytearray()
+    blob = bytearray()
+    for name in names:
+        entries += ENTRY.pack(len(blob), len(name), ids[name])
+        blob += name
+
+    # Write next to the target and swap it in, so a reader never maps a half written file
+    temporary = f"{target}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(names)))
+        f.write(entries)
+        f.write(blob)
+    os.replace(temporary, target)
+    return len(names)
+
+class BuffIndex():
+    """Read-only mapping of market hash name to Buff goods id, backed by the compiled index."""
+    def __init__(self, path: str = INDEX_PATH, source: str = SOURCE_PATH):
+        self.path = path
+        self.source = source
+        self._map: mmap.mmap = None
+        self._count = 0
+        self._names_start = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"BuffIndex Path={self.path}, Loaded={self._map is not None}"
+
+    def _outdated(self) -> bool:
+        if not os.path.exists(self.path):
+            return True
+        return os.path.exists(self.source) and os.path.getmtime(self.source) > os.path.getmtime(self.path)
+
+    def _open(self):
+        with self._lock:
+            if self._map is not None:
+                return
+            if self._outdated():
+                print(f"Building {self.path} from {self.source}")
+                build_index(self.source, self.path)
+            with open(self.path, "rb") as f:
+                index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, count = HEADER.unpack_from(index_map, 0)
+            if magic != MAGIC:
+                index_map.close()
+                raise ValueError(f"{self.path} is not a Buff goods id index")
+            self._count = count
+            self._names_start = HEADER.size + count * ENTRY.size
+            self._map = index_map
+
+    def _entry(self, position: int) -> tuple[bytes, int]:
+        offset, length, goods_id = ENTRY.unpack_from(self._map, HEADER.size + position * ENTRY.size)
+        start = self._names_start + offset
+        return self._map[start:start+length], goods_id
+
+    def _search(self, key: bytes) -> int:
+        """Position of the first name not below `key`."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._entry(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get(self, name: str, default: int = None) -> int:
+        if self._map is None:
+            self._open()
+        key = name.encode("utf8")
+        position = self._search(key)
+        if position < self._count:
+            found, goods_id = self._entry(position)
+            if found == key:
+                return goods_id
+        return default
+
+    def __getitem__(self, name: str) -> int:
+        goods_id = self.get(name)
+        if goods_id is None:
+            raise KeyError(name)
+        return goods_id
+
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and self.get(name) is not None
+
+    def __len__(self):
+        if self._map is None:
+            self._open()
+        return self._count
+
+    def items(self):
+        """(name, goods id) pairs in name order."""
+        for position in range(len(self)):
+            name, goods_id = self._entry(position)
+            yield name.decode("utf8"), goods_id
+
+    def names(self):
+        for name, _ in self.items():
+            yield name
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else SOURCE_PATH
+    target = sys.argv[2] if len(sys.argv) > 2 else INDEX_PATH
+    print(f"Indexed {build_index(source, target)} names from {source} into {target}")
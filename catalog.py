@@ -0,0 +1,143 @@
+import asyncio
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from typing import NamedTuple
+
+import buff
+
+RESOLVE_SCORE = 0.9  # A fuzzy match has to score this high to be priced in place of an unknown name
+MAX_CANDIDATES = 30  # Candidates scored in full per fuzzy query
+POSTING_BUDGET = 2000  # Name positions counted per fuzzy query before the candidates are picked
+
+def normalize(name: str) -> str:
+    """Lower case, without ™/★ marks, accents, punctuation or repeated spaces."""
+    name = unicodedata.normalize("NFKD", name).replace("™", "").replace("★", "")
+    name = "".join(char for char in name if not unicodedata.combining(char))
+    name = re.sub(r"[^\w]+", " ", name.lower())
+    return " ".join(name.split())
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i+3] for i in range(len(padded) - 2)}
+
+class Match(NamedTuple):
+    name: str
+    goods_id: int
+    score: float
+
+class Catalog():
+    """Searches the Buff item names by normalized name, prefix and trigram similarity.
+
+    The indexes are built from the goods id index on first use: the names sorted by normalized
+    form for exact and prefix lookups, and posting lists of name positions per trigram.
+    """
+    def __init__(self, index=None):
+        self.index = index if index is not None else buff.ITEM_IDS
+        self._names: list[str] = None
+        self._goods_ids: list[int] = None
+        self._normalized: list[str] = None
+        self._postings: dict[str, list[int]] = None
+        self._trigram_counts: list[int] = None
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"Catalog Names={len(self._names) if self._names else None}"
+
+    @property
+    def built(self) -> bool:
+        return self._names is not None
+
+    async def ensure_built(self):
+        """Build the indexes off the event loop, building them takes most of a second."""
+        if not self.built:
+            await asyncio.to_thread(self.build)
+
+    def build(self):
+        with self._lock:
+            if self._names is not None:
+                return
+            entries = sorted(((normalize(name), name, goods_id) for name, goods_id in self.index.items()))
+            postings = {}
+            trigram_counts = []
+            for position, (normalized, _, _) in enumerate(entries):
+                name_trigrams = trigrams(normalized)
+                trigram_counts.append(len(name_trigrams))
+                for trigram in name_trigrams:
+                    postings.setdefault(trigram, []).append(position)
+            self._trigram_counts = trigram_counts
+            self._normalized = [entry[0] for entry in entries]
+            self._goods_ids = [entry[2] for entry in entries]
+            self._postings = postings
+            self._names = [entry[1] for entry in entries]
+
+    def _match(self, position: int, score: float) -> Match:
+        return Match(self._names[position], self._goods_ids[position], score)
+
+    def prefix(self, query: str, limit: int = 25) -> list[Match]:
+        if self._names is None:
+            self.build()
+        key = normalize(query)
+        matches = []
+        position = bisect_left(self._normalized, key)
+        while position < len(self._normalized) and len(matches) < limit and self._normalized[position].startswith(key):
+            # Shorter names are closer to what was typed
+            matches.append(self._match(position, 0.5 + 0.5 * len(key) / len(self._normalized[position])))
+            position += 1
+        return matches
+
+    def fuzzy(self, query: str, limit: int = 25) -> list[Match]:
+        """Names ranked by trigram similarity (Dice coefficient) to the query."""
+        if self._names is None:
+            self.build()
+        query_trigrams = trigrams(normalize(query))
+        # Rarest trigrams first, stop once enough names have been touched to pick candidates from
+        postings = sorted((self._postings[trigram] for trigram in query_trigrams if trigram in self._postings), key=len)
+        shared = Counter()
+        touched = 0
+        counted = 0
+        for posting in postings:
+            if touched + len(posting) > POSTING_BUDGET and shared:
+                break
+            shared.update(posting)
+            touched += len(posting)
+            counted += 1
+
+        matches = []
+        for position, count in shared.most_common(MAX_CANDIDATES):
+            # Postings hold positions in ascending order, finish the candidate's count with a bisect in each common one
+            for posting in postings[counted:]:
+                index = bisect_left(posting, position)
+                if index < len(posting) and posting[index] == position:
+                    count += 1
+            score = 2 * count / (len(query_trigrams) + self._trigram_counts[position])
+            matches.append(self._match(position, score))
+        matches.sort(key=lambda match: -match.score)
+        return matches[:limit]
+
+    def search(self, query: str, limit: int = 25) -> list[Match]:
+        """Exact and prefix matches of the normalized query, topped up with fuzzy matches when there are too few."""
+        if not normalize(query):
+            return []
+        matches = self.prefix(query, limit)
+        if len(matches) < limit:
+            matches += self.fuzzy(query, limit)
+        best = {}
+        for match in matches:
+            if match.name not in best or best[match.name].score < match.score:
+                best[match.name] = match
+        return sorted(best.values(), key=lambda match: -match.score)[:limit]
+
+    def resolve(self, name: str) -> Match:
+        """The catalog item a Steam market hash name stands for, or None if nothing is close enough."""
+        goods_id = self.index.get(name)
+        if goods_id is not None:
+            return Match(name, goods_id, 1.0)
+        matches = self.search(name, 1)
+        if matches and matches[0].score >= RESOLVE_SCORE:
+            return matches[0]
+        return None
+
+CATALOG = Catalog()
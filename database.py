@@ -1,18 +1,24 @@
 import os
-import random
-import time
-from dotenv import load_dotenv, set_key
-import requests
-from sqlalchemy import ForeignKey, Column, Integer, String, Float, DateTime, Boolean
-from sqlalchemy import event, create_engine, func
-from sqlalchemy.orm import declarative_base, relationship, joinedload, sessionmaker
+import re
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from sqlalchemy import ForeignKey, Column, Integer, String, Float, DateTime, Boolean, Index
+from sqlalchemy import event, create_engine, func, insert, update, select, delete, bindparam, inspect, text, case, type_coerce, literal_column
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert, dialect as sqlite_dialect
+from sqlalchemy.orm import declarative_base, relationship, joinedload, sessionmaker, scoped_session
 
 from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 import game
-from exceptions import InsufficientBalanceException, NoGamblerException, TradeURLMissingException
+from betbook import BookEntry, RoundBook
+from gambler_index import GAMBLER_INDEX
+from levels import level_for_xp, daily_for_level
+from money import Money, to_money, to_cents
+import metrics
+from exceptions import InsufficientBalanceException, NoGamblerException, TradeURLMissingException, StaleLeaseException
 
 from settings import LEVELS
-import settings
 LEVELS:list[dict]
 #    "level": 1,
 #    "daily": 0.02,
@@ -29,17 +35,22 @@ class Gambler(Base):
     
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
-    balance = Column(Float, default=0)
+    balance = Column(Money, default=0)
     xp = Column(Integer, default=0)
     level = Column(Integer, default=1)
-    daily = Column(Float, default=10.00)
+    daily = Column(Money, default=10.00)
     daily_cooldown = Column(DateTime(timezone=True), default=datetime.now())
-    default_bet_amount = Column(Float, default=1.00)
+    default_bet_amount = Column(Money, default=1.00)
     trade_url = Column(String, nullable=True)
+    total_wagered = Column(Money, nullable=False, default=0)
+
+    # The leaderboard is read straight off this index, ordered by balance then total wagered
+    __table_args__ = (Index("ix_gamblers_balance_total_wagered", "balance", "total_wagered"),)
 
     # Relationship to bets
     bets = relationship("Bet", back_populates="gambler")
     items = relationship("Item", back_populates="gambler")
+    stats = relationship("GamblerStats", back_populates="gambler", uselist=False, cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"Name={self.name} (Lvl.{self.level}), Balance={self.balance}"
@@ -47,7 +58,7 @@ class Gambler(Base):
     def __lt__(self, other):
         if self.balance != other.balance:
             return self.balance < other.balance
-        return sum(bet.amount for bet in self.bets) < sum(bet.amount for bet in other.bets)
+        return self.total_wagered < other.total_wagered
 
     def __le__(self, other):
         return self < other or self == other
@@ -59,26 +70,104 @@ class Gambler(Base):
         return not self < other
 
     def __eq__(self, other):
-        return self.balance == other.balance and sum(bet.amount for bet in self.bets) == sum(bet.amount for bet in other.bets)
+        return self.balance == other.balance and self.total_wagered == other.total_wagered
 
     def __ne__(self, other):
         return not self == other
 
+class GamblerStats(Base):
+    """Lifetime betting statistics of a gambler, kept up to date by round settlement."""
+    __tablename__ = 'gambler_stats'
+
+    gambler_id = Column(Integer, ForeignKey('gamblers.id'), primary_key=True)
+    red_bets = Column(Integer, nullable=False, default=0)
+    red_wins = Column(Integer, nullable=False, default=0)
+    red_wagered = Column(Money, nullable=False, default=0)
+    green_bets = Column(Integer, nullable=False, default=0)
+    green_wins = Column(Integer, nullable=False, default=0)
+    green_wagered = Column(Money, nullable=False, default=0)
+    black_bets = Column(Integer, nullable=False, default=0)
+    black_wins = Column(Integer, nullable=False, default=0)
+    black_wagered = Column(Money, nullable=False, default=0)
+    net_profit = Column(Money, nullable=False, default=0)
+    current_streak = Column(Integer, nullable=False, default=0)  # Positive for rounds won in a row, negative for lost
+    longest_win_streak = Column(Integer, nullable=False, default=0)
+    longest_loss_streak = Column(Integer, nullable=False, default=0)
+
+    gambler = relationship("Gambler", back_populates="stats")
+
+    def __repr__(self):
+        return f"Stats Gambler={self.gambler_id}, Bets={self.total_bets}, Profit={self.net_profit}"
+
+    @classmethod
+    def empty(cls, gambler_id:int = None) -> "GamblerStats":
+        columns = STATS_COUNTERS + ["current_streak", "longest_win_streak", "longest_loss_streak"]
+        return cls(gambler_id=gambler_id, **{column: 0 for column in columns})
+
+    @property
+    def total_bets(self) -> int:
+        return self.red_bets + self.green_bets + self.black_bets
+
+    @property
+    def total_wagered(self) -> Decimal:
+        return self.red_wagered + self.green_wagered + self.black_wagered
+
+class ArchivedMonth(Base):
+    """Totals of the rounds of a month that were moved to its archive file."""
+    __tablename__ = 'archived_months'
+
+    month = Column(String, primary_key=True)  # YYYY-MM
+    path = Column(String, nullable=False)
+    rounds = Column(Integer, nullable=False, default=0)
+    red_rounds = Column(Integer, nullable=False, default=0)
+    green_rounds = Column(Integer, nullable=False, default=0)
+    black_rounds = Column(Integer, nullable=False, default=0)
+    bets = Column(Integer, nullable=False, default=0)
+    wagered = Column(Money, nullable=False, default=0)
+    net_profit = Column(Money, nullable=False, default=0)  # Of the gamblers, the house made the opposite
+
+    def __repr__(self):
+        return f"ArchivedMonth Month={self.month}, Rounds={self.rounds}, Bets={self.bets}"
+
+class ArchivedGamblerMonth(Base):
+    """A gambler's statistics counters over the archived rounds of a month."""
+    __tablename__ = 'archived_gambler_months'
+
+    month = Column(String, primary_key=True)
+    gambler_id = Column(Integer, primary_key=True)
+    red_bets = Column(Integer, nullable=False, default=0)
+    red_wins = Column(Integer, nullable=False, default=0)
+    red_wagered = Column(Money, nullable=False, default=0)
+    green_bets = Column(Integer, nullable=False, default=0)
+    green_wins = Column(Integer, nullable=False, default=0)
+    green_wagered = Column(Money, nullable=False, default=0)
+    black_bets = Column(Integer, nullable=False, default=0)
+    black_wins = Column(Integer, nullable=False, default=0)
+    black_wagered = Column(Money, nullable=False, default=0)
+    net_profit = Column(Money, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"ArchivedGamblerMonth Month={self.month}, Gambler={self.gambler_id}, Profit={self.net_profit}"
+
+STATS_COLORS = {game.Results.RED: "red", game.Results.GREEN: "green", game.Results.BLACK: "black"}
+STATS_COUNTERS = [f"{color}_{counter}" for color in STATS_COLORS.values() for counter in ("bets", "wins", "wagered")] + ["net_profit"]
+
 class Item(Base):
     __tablename__ = 'items'
-    id = Column(Integer, nullable=False, primary_key=True)
+    # Steam asset id, so copies of the same skin are separate items
+    asset_id = Column(String, primary_key=True)
     name = Column(String)
     exterior = Column(String)
     float_val = Column(Float, default=None)
     is_tradable = Column(Boolean)
-    tradable_date = Column(DateTime, default=None)
+    tradable_date = Column(String, default=None)
     inspect_link = Column(String)
     image_url = Column(String)
-    buff_price = Column(Float, nullable=True)
+    buff_price = Column(Money, nullable=True)
     last_update = Column(DateTime, default=datetime.now(timezone.utc))
 
     # Foreign key to link items to gamblers
-    gambler_id = Column(Integer, ForeignKey('gamblers.id'), nullable=False)
+    gambler_id = Column(Integer, ForeignKey('gamblers.id'), nullable=False, index=True)
 
     # Relationship back to gambler
     gambler = relationship("Gambler", back_populates="items")
@@ -113,13 +202,34 @@ class Item(Base):
             return self.buff_price != other.buff_price
         return NotImplemented
 
+# Fields a Steam inventory refresh writes, the ones the item diff compares
+ITEM_FIELDS = ("name", "exterior", "is_tradable", "tradable_date", "inspect_link", "image_url", "buff_price")
+
+class ItemPrice(Base):
+    """Buff prices shared by every gambler holding an item, keyed by market hash name."""
+    __tablename__ = 'item_prices'
+
+    name = Column(String, primary_key=True)
+    lowest_sell = Column(Float, nullable=True)
+    highest_buy = Column(Float, nullable=True)
+    yuan_usd = Column(Float, nullable=False)
+    fetched_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"ItemPrice Name={self.name}, Sell={self.lowest_sell}, Buy={self.highest_buy} ({self.fetched_at})"
+
 class Round(Base):
     __tablename__ = 'rounds'
 
     id = Column(String, primary_key=True)
     result_num = Column(Integer, nullable=False)
     result_color = Column(String, nullable=False)
-    timestamp = Column(DateTime, nullable=True, default=func.now())
+    timestamp = Column(DateTime, nullable=True, default=func.now(), index=True)
+    settled = Column(Boolean, nullable=False, default=False)
+    table_id = Column(Integer, nullable=True)  # Channel id of the table that played it
+
+    # Every table reads its own last rounds
+    __table_args__ = (Index("ix_rounds_table_id_timestamp", "table_id", "timestamp"),)
 
     # Relationship to bets
     bets = relationship("Bet", back_populates="round")
@@ -127,20 +237,37 @@ class Round(Base):
     def __repr__(self):
         return f"ID={self.id} Result={self.result_color}_{self.result_num} ({self.timestamp})"
 
+class TableFence(Base):
+    """Lease token of the shard that took over a table last. Writes carrying an older token come from a
+    shard that lost the table and are refused."""
+    __tablename__ = 'table_fences'
+
+    table_id = Column(Integer, primary_key=True)
+    token = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"TableFence Table={self.table_id}, Token={self.token}"
+
 class Bet(Base):
     __tablename__ = 'bets'
 
     id = Column(String, primary_key=True)
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     bet_on = Column(String)
     is_correct = Column(Boolean)
-    old_balance = Column(Float, nullable=False)
-    new_balance = Column(Float, nullable=False)
+    old_balance = Column(Money, nullable=False)
+    new_balance = Column(Money, nullable=False)
     timestamp = Column(DateTime, nullable=True, default=func.now())
 
     gambler_id = Column(Integer, ForeignKey('gamblers.id'), nullable=False)
     round_id = Column(Integer, ForeignKey('rounds.id'), nullable=False)
 
+    # Settlement reads a round's bets, history and stats read a gambler's bets round by round
+    __table_args__ = (
+        Index("ix_bets_round_id", "round_id"),
+        Index("ix_bets_gambler_id_round_id", "gambler_id", "round_id"),
+    )
+
     gambler = relationship("Gambler", back_populates="bets")
     round = relationship("Round", back_populates="bets")
 
@@ -158,25 +285,182 @@ def set_bet_id(mapper, connection, target):
     if not target.id:
         target.id = generate_unique_id(prefix="bet")
 
-VOLUME_DIR = "/database"
+VOLUME_DIR = os.getenv("DATABASE_DIR", "/database")
 DB_NAME = "roulette_game.db"
 DATABASE_PATH = os.path.join(VOLUME_DIR, DB_NAME)
 os.makedirs(VOLUME_DIR, exist_ok=True)
 DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 
+# Storage profile applied to every connection. WAL lets the bot read while a round settles and
+# NORMAL sync is safe under WAL, only the last transactions can be lost on power failure.
+SQLITE_PROFILES = {
+    "tuned": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -65536,  # KiB, 64 MB
+        "mmap_size": 268435456,  # 256 MB
+        "temp_store": "MEMORY",
+    },
+    "default": {},
+}
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "tuned")
+
 engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
+
+@event.listens_for(engine, "connect")
+def apply_sqlite_profile(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in SQLITE_PROFILES[SQLITE_PROFILE].items():
+        cursor.execute(f"PRAGMA {pragma} = {value}")
+    cursor.close()
+
+# Objects stay readable after their unit of work has committed and closed the session
+Session = sessionmaker(bind=engine, expire_on_commit=False)
+EXISTING_TABLES = set(inspect(engine).get_table_names())
 Base.metadata.create_all(engine)
-session = Session()
+session = scoped_session(Session)
+
+# ---------------------------- MIGRATIONS ---------------------------- #
+# `create_all` only creates missing tables. Changes to existing tables are migrations, applied in order
+# and recorded in PRAGMA user_version. Append new ones, never reorder or edit applied ones.
+def columns_of(connection, table: str) -> set[str]:
+    return {column["name"] for column in inspect(connection).get_columns(table)}
+
+def migration_settled_rounds(connection):
+    if "settled" not in columns_of(connection, "rounds"):
+        connection.execute(text("ALTER TABLE rounds ADD COLUMN settled BOOLEAN NOT NULL DEFAULT 0"))
+        # Rounds played before the marker existed were already paid out
+        connection.execute(text("UPDATE rounds SET settled = 1"))
+
+def migration_total_wagered(connection):
+    if "total_wagered" not in columns_of(connection, "gamblers"):
+        connection.execute(text("ALTER TABLE gamblers ADD COLUMN total_wagered FLOAT NOT NULL DEFAULT 0"))
+        connection.execute(text("UPDATE gamblers SET total_wagered = (SELECT COALESCE(SUM(amount), 0) FROM bets WHERE bets.gambler_id = gamblers.id)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_gamblers_balance_total_wagered ON gamblers (balance, total_wagered)"))
+
+def migration_items_by_asset_id(connection):
+    if "asset_id" not in columns_of(connection, "items"):
+        # Items only mirror Steam inventories, the next refresh fills the table again keyed by asset id
+        Item.__table__.drop(connection)
+        Item.__table__.create(connection)
+
+def migration_query_indexes(connection):
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_bets_round_id ON bets (round_id)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_bets_gambler_id_round_id ON bets (gambler_id, round_id)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_rounds_timestamp ON rounds (timestamp)"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_items_gambler_id ON items (gambler_id)"))
+    connection.execute(text("ANALYZE"))
+
+# Money columns of each table, stored as integer cents since migration_money_in_cents
+MONEY_COLUMNS = {
+    "gamblers": ["balance", "daily", "default_bet_amount", "total_wagered"],
+    "bets": ["amount", "old_balance", "new_balance"],
+    "items": ["buff_price"],
+    "gambler_stats": ["red_wagered", "green_wagered", "black_wagered", "net_profit"],
+    "archived_months": ["wagered", "net_profit"],
+    "archived_gambler_months": ["red_wagered", "green_wagered", "black_wagered", "net_profit"],
+}
+
+def rebuild_in_cents(connection, table: str, money_columns: list[str]):
+    """Turn the dollar amounts of `table` into integer cents. SQLite cannot change the type of a column,
+    so the table is copied into a new one declaring them INTEGER and its indexes are created again."""
+    declared = {row[1]: row[2].upper() for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+    converted = [column for column in money_columns if column in declared and declared[column] != "INTEGER"]
+    if not converted:
+        return
+    create_sql = connection.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).scalar()
+    index_sqls = connection.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+    ).scalars().all()
+    create_sql = re.sub(r"^CREATE TABLE\s+\S+?\s*\(", f"CREATE TABLE {table}_cents (", create_sql, count=1)
+    for column in converted:
+        create_sql = re.sub(rf"\b{column}\s+{declared[column]}\b", f"{column} INTEGER", create_sql, count=1, flags=re.IGNORECASE)
+    selected = ", ".join(f"CAST(ROUND({column} * 100) AS INTEGER)" if column in converted else column for column in declared)
+    connection.exec_driver_sql(create_sql)
+    connection.exec_driver_sql(f"INSERT INTO {table}_cents ({', '.join(declared)}) SELECT {selected} FROM {table}")
+    connection.exec_driver_sql(f"DROP TABLE {table}")
+    connection.exec_driver_sql(f"ALTER TABLE {table}_cents RENAME TO {table}")
+    for index_sql in index_sqls:
+        connection.exec_driver_sql(index_sql)
+
+def migration_money_in_cents(connection):
+    tables = set(inspect(connection).get_table_names())
+    for table, money_columns in MONEY_COLUMNS.items():
+        if table in tables:
+            rebuild_in_cents(connection, table, money_columns)
+    # Archive files keep copies of the rounds and bets tables, their amounts follow the live ones
+    if "archived_months" in tables:
+        for path in connection.exec_driver_sql("SELECT path FROM archived_months").scalars():
+            if not os.path.exists(path):
+                continue
+            archive_engine = create_engine(f"sqlite:///{path}")
+            with archive_engine.begin() as archive_connection:
+                if "bets" in inspect(archive_connection).get_table_names():
+                    rebuild_in_cents(archive_connection, "bets", MONEY_COLUMNS["bets"])
+            archive_engine.dispose()
+
+def migration_round_tables(connection):
+    if "table_id" not in columns_of(connection, "rounds"):
+        connection.execute(text("ALTER TABLE rounds ADD COLUMN table_id INTEGER"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_rounds_table_id_timestamp ON rounds (table_id, timestamp)"))
+
+MIGRATIONS = [
+    migration_settled_rounds,
+    migration_total_wagered,
+    migration_items_by_asset_id,
+    migration_query_indexes,
+    migration_money_in_cents,
+    migration_round_tables,
+]
+
+def get_schema_version(connection) -> int:
+    return connection.execute(text("PRAGMA user_version")).scalar()
+
+def migrate():
+    """Bring the database up to the latest schema version, one migration per transaction."""
+    with engine.begin() as connection:
+        version = get_schema_version(connection)
+        if not EXISTING_TABLES:
+            # `create_all` just built the latest schema
+            connection.execute(text(f"PRAGMA user_version = {len(MIGRATIONS)}"))
+            return
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with engine.begin() as connection:
+            migration(connection)
+            connection.execute(text(f"PRAGMA user_version = {number}"))
+        print(f"Database migrated to version {number} ({migration.__name__})")
+migrate()
 
 print(f"Database connected at: {DATABASE_URL}")
 
+# ---------------------------- ASYNC ACCESS ---------------------------- #
+# Every query of the bot runs on this single worker thread, so a slow query never blocks the event loop
+# and SQLite only ever sees one writer.
+DB_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="database")
+
+def unit_of_work(function, *args, **kwargs):
+    """Run `function` with a fresh session of the current thread and close the session afterwards."""
+    try:
+        return function(*args, **kwargs)
+    finally:
+        session.remove()
+
+async def run(function, *args, **kwargs):
+    """Run a database function on the database thread as one unit of work, e.g. `await database.run(database.get_last_round)`."""
+    loop = asyncio.get_running_loop()
+    call = partial(unit_of_work, function, *args, **kwargs)
+    if metrics.ENABLED:
+        call = metrics.timed_db_call(call, getattr(function, "__name__", "call"))
+    return await loop.run_in_executor(DB_EXECUTOR, call)
+
 # Gambler CRUD Operations
 def create_gambler(id, name, balance=0, xp=0, level=1, daily=10.00, default_bet_amount=1) -> Gambler:
     try:
         gambler = Gambler(id=id, name=name, balance=balance, xp=xp, level=level, daily=daily, default_bet_amount=default_bet_amount)
         session.add(gambler)
         session.commit()
+        GAMBLER_INDEX.add(gambler.id, gambler.name)
         print(f"Gambler {name} created with ID={gambler.id}")
         return gambler
     except Exception as e:
@@ -185,7 +469,7 @@ def create_gambler(id, name, balance=0, xp=0, level=1, daily=10.00, default_bet_
         return None
 
 def get_gambler_by_id(gambler_id: int) -> Gambler:
-    gambler = session.query(Gambler).options(joinedload(Gambler.bets)).filter_by(id=gambler_id).first()
+    gambler = session.query(Gambler).options(joinedload(Gambler.stats)).filter_by(id=gambler_id).first()
     if gambler:
         return gambler
     else:
@@ -201,11 +485,25 @@ def update_daily_cooldown(gambler_id: int):
         print(f"Error updating daily reward cooldown: {e}")
         raise e
     
+def claim_daily_reward(gambler_id: int) -> tuple[Gambler, bool]:
+    """Pay the daily reward if the cooldown is over. Returns the gambler and whether the reward was paid."""
+    try:
+        gambler = get_gambler_by_id(gambler_id)
+        if datetime.now(timezone.utc) <= gambler.daily_cooldown.astimezone(timezone.utc):
+            return gambler, False
+        gambler.balance += gambler.daily
+        gambler.daily_cooldown = datetime.now().replace(microsecond=0) + timedelta(days=1)
+        session.commit()
+        return gambler, True
+    except Exception as e:
+        session.rollback()
+        print(f"Error claiming daily reward: {e}")
+        raise e
+
 def update_gambler_balance(gambler_id:int, update_balance:float):
     try:
         gambler = get_gambler_by_id(gambler_id)
-        gambler.balance += update_balance
-        gambler.balance = round(gambler.balance, 2)
+        gambler.balance += to_money(update_balance)
         session.commit()
     except Exception as e:
         session.rollback()
@@ -216,6 +514,7 @@ def delete_gambler(gambler_id:int):
         gambler = get_gambler_by_id(gambler_id)
         session.delete(gambler)
         session.commit()
+        GAMBLER_INDEX.remove(gambler_id)
         print(f"Gambler ID={gambler_id} deleted")
     except Exception as e:
         session.rollback()
@@ -224,27 +523,12 @@ def delete_gambler(gambler_id:int):
 def set_gambler_bet_amount(gambler_id:int, bet_amount:float):
     try:
         gambler = get_gambler_by_id(gambler_id)
-        gambler.default_bet_amount = bet_amount
+        gambler.default_bet_amount = to_money(bet_amount)
         session.commit()
     except Exception as e:
         session.rollback()
         print(f"Error setting gambler's new bet amount: {e}")
 
-def gambler_update_xp(gambler_id:int, xp:int):
-    try:
-        gambler = get_gambler_by_id(gambler_id)
-        gambler.xp += xp
-        gambler.xp = int(gambler.xp)
-        
-        while gambler.xp >= LEVELS[gambler.level+1].get("total_xp"):
-            gambler.level = LEVELS[gambler.level+1].get("level")
-
-        gambler.daily = LEVELS[gambler.level].get("daily")
-        session.commit()
-    except Exception as e:
-        session.rollback()
-        print(f"Error updating xp: {e}")
-
 def set_trade_url(gambler_id:int, url:str) -> str:
     try:
         gambler = get_gambler_by_id(gambler_id)
@@ -256,13 +540,45 @@ def set_trade_url(gambler_id:int, url:str) -> str:
         print(f"Error setting the trade url: {e}")
         raise e
     
+# Table Fencing
+def fence_table(table_id:int, token:int) -> bool:
+    """Record the lease token of a shard taking over a table. False if a newer token already holds it."""
+    fences = TableFence.__table__
+    statement = sqlite_insert(fences).values(table_id=table_id, token=token)
+    statement = statement.on_conflict_do_update(
+        index_elements=[fences.c.table_id],
+        set_={"token": statement.excluded.token},
+        where=fences.c.token <= statement.excluded.token,
+    )
+    accepted = session.execute(statement).rowcount
+    session.commit()
+    return bool(accepted)
+
+def check_fence(fence:tuple[int, int] = None):
+    """Raise StaleLeaseException unless the (table id, token) pair still holds its table.
+
+    The check is a write, so it takes SQLite's write lock and no other shard can fence the table
+    until the transaction it opens is over.
+    """
+    if fence is None:
+        return
+    table_id, token = fence
+    fences = TableFence.__table__
+    held = session.execute(
+        update(fences).where(fences.c.table_id == table_id, fences.c.token == token).values(token=token)
+    ).rowcount
+    if not held:
+        raise StaleLeaseException(f"Table {table_id} is held by a newer lease than {token}.")
+
 # Round CRUD Operations
-def create_round(round_id:str, round_result:int) -> Round:
+def create_round(round_id:str, round_result:int, table_id:int = None, fence:tuple[int, int] = None) -> Round:
     try:
+        check_fence(fence)
         round_entry = Round(
             id = round_id,
             result_num = round_result,
-            result_color = game.NUMBER_COLOR_MAPPING.get(round_result)
+            result_color = game.NUMBER_COLOR_MAPPING.get(round_result),
+            table_id = table_id,
         )
         session.add(round_entry)
         session.commit()
@@ -278,66 +594,297 @@ def get_round_by_id(round_id) -> Round:
     except Exception:
         return None
 
-def get_last_round() -> Round: 
+def get_last_round(table_id:int = None) -> Round:
+    """The last round of a table, of any table when `table_id` is None."""
     try:
-        round_entry = session.query(Round).order_by(Round.timestamp.desc()).first()
+        query = session.query(Round)
+        if table_id is not None:
+            query = query.filter(Round.table_id == table_id)
+        round_entry = query.order_by(Round.timestamp.desc()).first()
         return round_entry
     except Exception:
         return None
 
 
 # Bet CRUD Operations
-def create_bet(gambler:Gambler, round:Round, amount:float, bet_on:str) -> Bet:
+def create_bet(gambler:Gambler, round:Round, amount:float, bet_on:str, fence:tuple[int, int] = None) -> Bet:
+    amount = to_money(amount)
     if amount > gambler.balance:
         raise InsufficientBalanceException(f"You do not have enough credits.\nBalance: **${gambler.balance}**\nBet: **${amount}**")
     try:
+        check_fence(fence)
         is_correct = round.result_color == bet_on
-        if is_correct:
-            multiplier = (
-                game.RED_MULTIPLIER if bet_on == game.Results.RED else
-                game.BLACK_MULTIPLIER if bet_on == game.Results.BLACK else
-                game.GREEN_MULTIPLIER if bet_on == game.Results.GREEN else 0
-            )
-        else:
-            multiplier = 0
         new_bet = Bet(
             amount = amount,
             bet_on = bet_on,
             is_correct = is_correct,
             old_balance = gambler.balance,
-            new_balance = gambler.balance + (multiplier-1)*amount,
+            new_balance = gambler.balance - amount + game.payout(amount, bet_on, is_correct),
             gambler_id = gambler.id,
             round_id = round.id,
         )
         session.add(new_bet)
+        gamblers = Gambler.__table__
+        session.execute(
+            update(gamblers).where(gamblers.c.id == gambler.id).values(total_wagered=gamblers.c.total_wagered + amount)
+        )
         session.commit()
         return new_bet
     except Exception as e:
         session.rollback()
         print(f"Error creating bet: {e}")
 
+def create_bets(book: RoundBook, fence:tuple[int, int] = None) -> list[BookEntry]:
+    """Flush a sealed round book: inserts every bet and takes the stakes from the balances in one transaction.
+
+    A gambler may have bets open at several tables, each checked against their balance when they clicked.
+    Bets the balance no longer covers once their book is flushed are refused: neither stored nor staked.
+    Returns the refused entries for the caller to drop from the book. Raises when the flush fails, nothing
+    of the book is written then and the round has to be voided.
+    """
+    entries = list(book.entries.values())
+    if not entries:
+        return []
+    try:
+        check_fence(fence)
+        gamblers = Gambler.__table__
+        balances = {}
+        gambler_ids = list(book.entries)
+        for i in range(0, len(gambler_ids), 500):
+            for row in session.execute(select(gamblers.c.id, gamblers.c.balance).where(gamblers.c.id.in_(gambler_ids[i:i+500]))):
+                balances[row.id] = row.balance
+        accepted = []
+        refused = []
+        for entry in entries:
+            balance = balances.get(entry.gambler_id)
+            (accepted if balance is not None and balance >= entry.amount else refused).append(entry)
+        if not accepted:
+            return refused
+
+        # Stakes are bound as integer cents, the columns hold cents too. Should another writer have changed a
+        # balance since it was read, the guard keeps it from going negative and the flush fails as a whole
+        staked = session.execute(
+            update(gamblers)
+            .where(gamblers.c.id == bindparam("gambler_id"), gamblers.c.balance >= bindparam("stake", type_=Integer))
+            .values(
+                balance=gamblers.c.balance - bindparam("stake", type_=Integer),
+                total_wagered=gamblers.c.total_wagered + bindparam("stake", type_=Integer),
+            ),
+            [{"gambler_id": entry.gambler_id, "stake": to_cents(entry.amount)} for entry in accepted]
+        ).rowcount
+        if staked != len(accepted):
+            raise ValueError(f"{len(accepted) - staked} balances changed while the stakes were taken")
+
+        bet_rows = []
+        for entry in accepted:
+            is_correct = book.result_color == entry.bet_on
+            old_balance = balances[entry.gambler_id]  # What the stake is taken from, bets at other tables included
+            bet_rows.append({
+                "id": generate_unique_id(prefix="bet"),
+                "amount": entry.amount,
+                "bet_on": entry.bet_on,
+                "is_correct": is_correct,
+                "old_balance": old_balance,
+                "new_balance": old_balance - entry.amount + game.payout(entry.amount, entry.bet_on, is_correct),
+                "gambler_id": entry.gambler_id,
+                "round_id": book.round_id,
+            })
+        session.execute(insert(Bet), bet_rows)
+        session.commit()
+        session.expire_all()  # The bulk UPDATE bypassed the objects already loaded in this session
+        return refused
+    except Exception as e:
+        session.rollback()
+        print(f"Error flushing bets of round {book.round_id}: {e}")
+        raise
+
 def get_bet_of_gambler_by_round_id(gambler_id:int, round_id:int) -> Bet:
     bet = session.query(Bet).filter(Bet.gambler_id==gambler_id).filter(Bet.round_id==round_id).first()
     return bet
 
-def process_bets():
-    current_round:Round = get_last_round()
-    bets:list[Bet] = get_all_bets_by_round_id(current_round.id)
+def process_bets(round_id:str = None, fence:tuple[int, int] = None) -> bool:
+    """Settle a round: pays the winners and awards XP and levels to every bettor in one transaction.
+
+    The round is marked as settled in the same transaction, so settling it again (e.g. after a crash or by
+    another shard) is a no-op. Returns False when the round was already settled.
+    """
+    if round_id is None:
+        round_id = get_last_round().id
+    try:
+        check_fence(fence)
+        rounds = Round.__table__
+        marked = session.execute(
+            update(rounds).where(rounds.c.id == round_id, rounds.c.settled == False).values(settled=True)
+        ).rowcount
+        if not marked:
+            session.rollback()
+            return False
+
+        # Sum up the payout and XP of each gambler in the round, in integer cents
+        awards = {}
+        bets = session.execute(
+            select(Bet.gambler_id, Bet.amount, type_coerce(Bet.amount, Integer).label("stake"), Bet.bet_on, Bet.is_correct)
+            .where(Bet.round_id == round_id)
+        ).all()
+        upsert_gambler_stats(round_stats(bets).values())
+        for bet in bets:
+            payout, xp = awards.get(bet.gambler_id, (0, 0))
+            payout += game.payout(bet.stake, bet.bet_on, bet.is_correct)
+            xp += game.bet_xp(bet.stake)
+            awards[bet.gambler_id] = (payout, xp)
+
+        if awards:
+            gamblers = Gambler.__table__
+            current = session.execute(
+                select(gamblers.c.id, gamblers.c.xp, gamblers.c.level, gamblers.c.daily).where(gamblers.c.id.in_(awards))
+            ).all()
+            params = []
+            for gambler in current:
+                payout, xp = awards[gambler.id]
+                new_xp = (gambler.xp or 0) + xp
+                new_level = level_for_xp(new_xp, gambler.level)
+                params.append({
+                    "gambler_id": gambler.id,
+                    "payout": payout,
+                    "new_xp": new_xp,
+                    "new_level": new_level,
+                    # Leveling up never lowers a daily reward that is already higher than the level's
+                    "new_daily": max(gambler.daily or 0, daily_for_level(new_level)),
+                })
+            session.execute(
+                update(gamblers)
+                .where(gamblers.c.id == bindparam("gambler_id"))
+                .values(
+                    balance=gamblers.c.balance + bindparam("payout", type_=Integer),
+                    xp=bindparam("new_xp"),
+                    level=bindparam("new_level"),
+                    daily=bindparam("new_daily"),
+                ),
+                params
+            )
+        session.commit()
+        session.expire_all()  # The bulk UPDATE bypassed the objects already loaded in this session
+        return True
+    except Exception as e:
+        session.rollback()
+        print(f"Error settling round {round_id}: {e}")
+        return False
+
+def round_stats(bets) -> dict[int, dict]:
+    """Statistics of each gambler over the bets of a single round, as `gambler_stats` rows."""
+    rows = {}
     for bet in bets:
+        row = rows.get(bet.gambler_id)
+        if row is None:
+            row = rows[bet.gambler_id] = {"gambler_id": bet.gambler_id, **{column: 0 for column in STATS_COUNTERS}}
+        color = STATS_COLORS.get(bet.bet_on)
+        row[f"{color}_bets"] += 1
+        row[f"{color}_wagered"] += bet.amount
         if bet.is_correct:
-            multiplier = (
-                game.RED_MULTIPLIER if bet.bet_on == game.Results.RED else
-                game.BLACK_MULTIPLIER if bet.bet_on == game.Results.BLACK else
-                game.GREEN_MULTIPLIER if bet.bet_on == game.Results.GREEN else 0
-            )
-            update_gambler_balance(bet.gambler_id, bet.amount*multiplier)
+            row[f"{color}_wins"] += 1
+        row["net_profit"] += game.payout(bet.amount, bet.bet_on, bet.is_correct) - bet.amount
+
+    for row in rows.values():
+        won = row["net_profit"] > 0
+        row["current_streak"] = 1 if won else -1
+        row["longest_win_streak"] = 1 if won else 0
+        row["longest_loss_streak"] = 0 if won else 1
+    return rows
+
+def compile_gambler_stats_upsert():
+    """The statement of `upsert_gambler_stats`, compiled once. SQLAlchemy never caches ON CONFLICT statements,
+    so building and compiling it again made up most of the time of settling a round."""
+    stats = GamblerStats.__table__
+    statement = sqlite_insert(stats)
+    excluded = statement.excluded
+    # Constants are written into the SQL, only the rows are bound
+    zero, one, minus_one = literal_column("0"), literal_column("1"), literal_column("-1")
+    streak = case(
+        (excluded.current_streak > zero, case((stats.c.current_streak > zero, stats.c.current_streak + one), else_=one)),
+        else_=case((stats.c.current_streak < zero, stats.c.current_streak - one), else_=minus_one),
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[stats.c.gambler_id],
+        set_={
+            **{column: stats.c[column] + excluded[column] for column in STATS_COUNTERS},
+            "current_streak": streak,
+            "longest_win_streak": func.max(stats.c.longest_win_streak, streak),
+            "longest_loss_streak": func.max(stats.c.longest_loss_streak, -streak),
+        }
+    )
+    # Every column is a named parameter, typed so that money is still bound as cents
+    sql = str(statement.compile(dialect=sqlite_dialect(paramstyle="named")))
+    return text(sql).bindparams(*(bindparam(column.name, type_=column.type) for column in stats.columns))
+
+GAMBLER_STATS_UPSERT = compile_gambler_stats_upsert()
+
+def upsert_gambler_stats(rows):
+    """Add one round's `round_stats` rows onto the gamblers' statistics, extending or breaking their streaks."""
+    rows = list(rows)
+    if not rows:
+        return
+    session.execute(GAMBLER_STATS_UPSERT, rows)
+
+def backfill_gambler_stats() -> int:
+    """Rebuild `gambler_stats` from the bets of every settled round. Returns the number of gamblers with statistics.
+
+    Archived rounds count through their monthly totals, streaks are rebuilt from the live rounds only.
+    """
+    try:
+        totals = {}
+        for summary in session.query(ArchivedGamblerMonth):
+            total = totals.setdefault(summary.gambler_id, {
+                "gambler_id": summary.gambler_id, **{column: 0 for column in STATS_COUNTERS},
+                "current_streak": 0, "longest_win_streak": 0, "longest_loss_streak": 0,
+            })
+            for column in STATS_COUNTERS:
+                total[column] += getattr(summary, column)
+        bets = session.execute(
+            select(Bet.gambler_id, Bet.amount, Bet.bet_on, Bet.is_correct)
+            # Not a join: bets.round_id is declared INTEGER and rounds.id VARCHAR, SQLite could not use the
+            # rounds primary key and would search rounds once per bet. The subquery is built once instead
+            .where(Bet.round_id.in_(select(Round.id).where(Round.settled == True)))
+            .order_by(Bet.gambler_id, Bet.timestamp)
+            .execution_options(yield_per=10000)
+        )
+        # A gambler bets once per round, so every bet is one round of their streaks
+        for bet in bets:
+            row = round_stats([bet])[bet.gambler_id]
+            total = totals.get(bet.gambler_id)
+            if total is None:
+                totals[bet.gambler_id] = row
+                continue
+            for column in STATS_COUNTERS:
+                total[column] += row[column]
+            won = row["current_streak"] > 0
+            total["current_streak"] = (max(total["current_streak"], 0) + 1) if won else (min(total["current_streak"], 0) - 1)
+            total["longest_win_streak"] = max(total["longest_win_streak"], total["current_streak"])
+            total["longest_loss_streak"] = max(total["longest_loss_streak"], -total["current_streak"])
+
+        session.execute(delete(GamblerStats))
+        if totals:
+            session.execute(insert(GamblerStats), list(totals.values()))
+        session.commit()
+        print(f"Statistics rebuilt for {len(totals)} gamblers.")
+        return len(totals)
+    except Exception as e:
+        session.rollback()
+        print(f"Error rebuilding gambler statistics: {e}")
+        raise e
+# Databases created before the statistics table existed get it built from their bets once
+if "bets" in EXISTING_TABLES and "gambler_stats" not in EXISTING_TABLES:
+    unit_of_work(backfill_gambler_stats)
+
+def get_unsettled_rounds(table_id:int = None) -> list[Round]:
+    """Unsettled rounds of a table, of no table (played before tables existed) when `table_id` is None."""
+    return session.query(Round).filter(Round.settled == False, Round.table_id == table_id).order_by(Round.timestamp).all()
 
 
 # Item CRUD Operations
 def get_items_by_gambler(gambler:Gambler) -> list[Item]:
     return session.query(Item).filter(Item.gambler == gambler).all()
 
-def refresh_user_items(gambler_id: int):
+def get_steam_id(gambler_id: int) -> str:
     gambler = session.query(Gambler).filter(Gambler.id == gambler_id).first()
     trade_url = gambler.trade_url
     if not trade_url:
@@ -347,174 +894,138 @@ def refresh_user_items(gambler_id: int):
     base_url, params = trade_url.split("?")
     query_params = dict(param.split("=") for param in params.split("&"))
     steam_partner_id = query_params.get("partner")
-
+    return str(baseid + int(steam_partner_id))
+
+def diff_items(current: dict[str, dict], incoming: dict[str, dict], fields=ITEM_FIELDS) -> tuple[list[dict], list[dict], list[str]]:
+    """Minimal (inserts, updates, deletes) turning `current` into `incoming`, both mapping asset ids to item fields."""
+    inserts = []
+    updates = []
+    for asset_id, row in incoming.items():
+        old_row = current.get(asset_id)
+        if old_row is None:
+            inserts.append(row)
+        elif any(old_row[field] != row[field] for field in fields):
+            updates.append(row)
+    deletes = [asset_id for asset_id in current if asset_id not in incoming]
+    return inserts, updates, deletes
+
+def save_user_items(gambler_id: int, items: list[dict]) -> tuple[int, int]:
+    """Write one batch of the gambler's Steam inventory, only the items that are new or changed.
+
+    `items` are rows with `asset_id` and every field of ITEM_FIELDS. An item already stored under another
+    gambler changed hands and is moved over. An item without a `buff_price` keeps the one it has stored,
+    Buff missing a price does not make it worthless. Returns the number of inserted and updated items.
+    """
+    fields = ITEM_FIELDS + ("gambler_id",)
+    incoming = {item["asset_id"]: {**item, "gambler_id": gambler_id} for item in items}
+    columns = [Item.asset_id] + [getattr(Item, field) for field in fields]
+    current = {}
+    asset_ids = list(incoming)
+    for i in range(0, len(asset_ids), 500):
+        for row in session.execute(select(*columns).where(Item.asset_id.in_(asset_ids[i:i+500]))):
+            current[row.asset_id] = row._asdict()
+    for asset_id, old_row in current.items():
+        if incoming[asset_id]["buff_price"] is None:
+            incoming[asset_id]["buff_price"] = old_row["buff_price"]
+    inserts, updates, _ = diff_items(current, incoming, fields)
+    if not (inserts or updates):
+        return 0, 0
+
+    now = datetime.now(timezone.utc)
     try:
-        user_id = str(baseid + int(steam_partner_id))
-        inventory_url = f"https://steamcommunity.com/inventory/{user_id}/730/2"
-        items_steam_inv = requests.get(inventory_url).json().get("descriptions")
-        steam_item_names = {item.get("market_hash_name") for item in items_steam_inv}
-        
-        # Delete the items that no longer in the inventory
-        current_items = {item.name: item for item in session.query(Item).filter(Item.gambler_id == gambler_id).all()}
-        no_longer_exist_items = [current_item for current_item in current_items.values() if current_item.name not in steam_item_names]
-        for item in no_longer_exist_items:
-            session.delete(item)
-
-        # Add or update items from the Steam inventory
-        for item_data in items_steam_inv:
-            name: str = item_data.get("market_hash_name")
-            existing_item = current_items.get(name)
-
-            # Check if the item exists and if it was updated within the last 24 hours
-            if existing_item and existing_item.last_update and (datetime.now() - existing_item.last_update) < timedelta(hours=24):
-                print(f"Skipping item *{name}* of *{gambler.name}* as it was updated within the last 24 hours.")
-                continue
-
-            # Delete the existing item if it's not updated within 24 hours
-            if existing_item:
-                session.delete(existing_item)
-
-            try:
-                item_buff_id = ITEM_ID_DICT[name]
-                print(f"{name} requested Buff Price! {datetime.now(timezone.utc)}")
-                buff_price_ls, buff_price_hb = getBuffDataByItemID(item_buff_id)
-                buff_price_ls *= 1.03
-                buff_price_hb *= 0.95
-            except:
-                buff_price_ls, buff_price_hb = None, None
-
-            shortname = item_data.get("name")
-            if name.startswith(shortname):
-                exterior = name[len(shortname):].strip().replace("(", "").replace(")", "")
-            else:
-                exterior = None
-            is_tradable = item_data.get("tradable")
-            image_url = "https://steamcommunity-a.akamaihd.net/economy/image/" + item_data.get("icon_url")
-            inspect_link = None
-            try:
-                inspect_link = item_data.get("actions")[0].get("link")
-            except Exception:
-                pass
-
-            tradable_date = None
-            try:
-                owner_descriptions = item_data.get("owner_descriptions", [])
-                if owner_descriptions and len(owner_descriptions) > 1:
-                    tradable_date = owner_descriptions[1].get("value")
-            except Exception:
-                pass
-
-            # Create the new item
-            new_item = Item(
-                name=name,
-                exterior=exterior,
-                is_tradable=is_tradable,
-                image_url=image_url,
-                buff_price=buff_price_hb,
-                tradable_date=tradable_date,
-                inspect_link=inspect_link,
-                gambler=gambler,
-                last_update=datetime.now(timezone.utc)  # Set the current time as the last update
+        if inserts:
+            session.execute(insert(Item), [{**row, "last_update": now} for row in inserts])
+        if updates:
+            item_table = Item.__table__
+            statement = (
+                update(item_table)
+                .where(item_table.c.asset_id == bindparam("item_asset_id"))
+                .values(last_update=now, **{field: bindparam(f"item_{field}") for field in fields})
             )
-            session.add(new_item)
-
+            session.execute(statement, [{f"item_{key}": value for key, value in row.items()} for row in updates])
         session.commit()
-        print("Items refreshed successfully.")
-
     except Exception as e:
         session.rollback()
-        print(f"Error fetching the items. {e}")
+        print(f"Error saving the items of {gambler_id}. {e}")
+        raise
+    session.expire_all()
+    return len(inserts), len(updates)
+
+def delete_missing_items(gambler_id: int, asset_ids: set[str]) -> int:
+    """Delete the gambler's items that are not in `asset_ids`, the complete set of their Steam inventory."""
+    current = session.execute(select(Item.asset_id).where(Item.gambler_id == gambler_id)).scalars()
+    deletes = [asset_id for asset_id in current if asset_id not in asset_ids]
+    if not deletes:
+        return 0
+    for i in range(0, len(deletes), 500):
+        session.execute(delete(Item).where(Item.asset_id.in_(deletes[i:i+500])))
+    session.commit()
+    session.expire_all()
+    return len(deletes)
+
+# Item Price Cache
+def get_item_prices(names) -> dict[str, ItemPrice]:
+    names = list(names)
+    prices = {}
+    # Stay under SQLite's bound parameter limit
+    for i in range(0, len(names), 500):
+        for price in session.query(ItemPrice).filter(ItemPrice.name.in_(names[i:i+500])):
+            prices[price.name] = price
+    return prices
+
+def save_item_prices(prices: dict[str, tuple[float, float]], yuan_usd: float, fetched_at: datetime):
+    if not prices:
+        return
+    rows = [
+        {"name": name, "lowest_sell": lowest_sell, "highest_buy": highest_buy, "yuan_usd": yuan_usd, "fetched_at": fetched_at}
+        for name, (lowest_sell, highest_buy) in prices.items()
+    ]
+    for i in range(0, len(rows), 100):
+        statement = sqlite_insert(ItemPrice).values(rows[i:i+100])
+        statement = statement.on_conflict_do_update(
+            index_elements=[ItemPrice.name],
+            set_={column: statement.excluded[column] for column in ("lowest_sell", "highest_buy", "yuan_usd", "fetched_at")},
+        )
+        session.execute(statement)
+    session.commit()
 
 # Utility Functions
 def get_all_gamblers() -> list[Gambler]:
     gamblers = session.query(Gambler).all()
     return gamblers
 
+def load_gambler_index():
+    GAMBLER_INDEX.load(session.query(Gambler.id, Gambler.name).all())
+
+def get_top_gamblers(limit:int = 10) -> list[Gambler]:
+    return session.query(Gambler).order_by(Gambler.balance.desc(), Gambler.total_wagered.desc()).limit(limit).all()
+
 def get_all_rounds() -> list[Round]:
     rounds = session.query(Round).all()
     return rounds
 
-def get_last_x_rounds(num: int) -> list[Round]:
+def get_last_x_rounds(num: int, table_id: int = None) -> list[Round]:
     try:
-        rounds = session.query(Round).order_by(Round.timestamp.desc()).limit(num).all()
+        query = session.query(Round)
+        if table_id is not None:
+            query = query.filter(Round.table_id == table_id)
+        rounds = query.order_by(Round.timestamp.desc()).limit(num).all()
         return rounds[::-1]
     except Exception as e:
         print(f"Error fetching last {num} rounds: {e}")
         return []
 
 def get_gambler_total_bet(gambler_id) -> float:
-    all_bets = session.query(Bet).filter(Bet.gambler_id==gambler_id).all()
-    return sum([bet.amount for bet in all_bets])
+    return session.query(Gambler.total_wagered).filter(Gambler.id==gambler_id).scalar() or 0
 
 def get_round_count() -> int:
-    return session.query(Round).count()
+    """Rounds ever played, the archived ones included."""
+    archived = session.query(func.coalesce(func.sum(ArchivedMonth.rounds), 0)).scalar()
+    return session.query(Round).count() + archived
 
 def get_all_bets_by_round_id(round_id:int) -> list[Bet]:   
     bets = session.query(Bet).filter(Bet.round_id==round_id).all()
     return bets
 
-
-# ---------------------------- BUFF PRICE ---------------------------- #
-RETRY = 4
-HEADERS = settings.buff_headers
-PARAMS = settings.buff_params
-PROXIES = None
-LS_url = "https://buff.163.com/api/market/goods/sell_order"
-HB_url = "https://buff.163.com/api/market/goods/buy_order"
-with open("buffids.txt", "r", encoding="utf8") as f:
-    lines = f.readlines()
-
-ITEM_ID_DICT = {line.split(";")[1].strip():line.split(";")[0] for line in lines}
-def getCNY_USD() -> float:
-        load_dotenv()
-        f = os.getenv("YUANUSD")
-        rate, date = f.split(",")
-        
-        dt_object = datetime.strptime(date, "%d/%m/%Y")
-        if dt_object < datetime.now():
-            try:
-                url = "https://api.exchangerate-api.com/v4/latest/CNY"
-                response = requests.get(url)
-                data = response.json()
-                rate = float(data["rates"]["USD"])
-                formatted_date = datetime.now().strftime("%d/%m/%Y")
-                set_key(".env", "YUANUSD", f"{str(rate)},{formatted_date}")
-            except Exception as e:
-                print(e)
-        return rate
-YUANUSD = getCNY_USD()
-
-def getBuffDataByItemID(itemid):
-    PARAMS["goods_id"] = str(itemid)
-    for try_count in range(RETRY):
-        try:
-            sellResponseRequest = requests.get(LS_url, params=PARAMS, headers=HEADERS, proxies=PROXIES, timeout=5)
-            sellResponse = sellResponseRequest.json()["data"]["items"]
-            break
-        except Exception as e:
-            if sellResponseRequest.status_code == 429:
-                print("Too many requests")
-                time.sleep(random.randint(1,3))
-            continue
-
-    for try_count in range(RETRY):
-        try:
-            buyResponseRequest = requests.get(HB_url, params=PARAMS, headers=HEADERS, proxies=PROXIES, timeout=5)
-            buyResponse = buyResponseRequest.json()["data"]["items"]
-            break
-        except Exception as e:
-            if buyResponseRequest.status_code == 429:
-                print("Too many requests")
-                time.sleep(random.randint(1,3))
-            continue
-
-    try:
-        lowestSell = round(float(sellResponse[0].get("price"))*YUANUSD, 2)
-    except Exception:
-        lowestSell = None
-    try:
-        highestBuy = round(float(buyResponse[0].get("price"))*YUANUSD, 2)
-    except Exception:
-        highestBuy = None
-
-    return (lowestSell, highestBuy)
\ No newline at end of file
+# Admin commands search gamblers in memory, fill the index once up front
+unit_of_work(load_gambler_index)
@@ -1,8 +1,9 @@
 from datetime import datetime, timedelta, timezone
 from discord import Interaction, Embed, Color
 from emojis import Emoji
-from database import Gambler, get_all_gamblers, Item
+from database import Gambler, GamblerStats, get_top_gamblers, Item
 import game
+import metrics
 
 def setup_roulette(roulette_sequence:list[Emoji]=None, last_results: list[Emoji]=None) -> Embed:
     if not roulette_sequence:
@@ -31,8 +32,8 @@ def result_roulette(roulette_sequence:list[Emoji]=None, last_results: list[Emoji
     return embed
 
 def leaderboard() -> Embed:
-    # Fetch all gamblers and sort them
-    gamblers: list[Gambler] = sorted(get_all_gamblers(), reverse=True)
+    # Fetch the top gamblers, already ordered by the leaderboard index
+    gamblers: list[Gambler] = get_top_gamblers(10)
     
     # Get the last update time
     last_update_date = (datetime.now(timezone.utc) + timedelta(hours=3)).strftime("%Y-%m-%d %H:%M:%S")
@@ -45,7 +46,7 @@ def leaderboard() -> Embed:
             break
         name = gambler.name[:16].ljust(16)  # Truncate and align name to 10 chars
         balance = f"{gambler.balance:.2f}".rjust(10)  # Format balance
-        bet_so_far = f"{sum(bet.amount for bet in gambler.bets):.2f}".rjust(10)  # Total bets placed
+        bet_so_far = f"{gambler.total_wagered:.2f}".rjust(10)  # Total bets placed
         leaderboard_rows.append(f"{rank:<4} {name} {balance} {bet_so_far}")
         rank += 1
 
@@ -88,20 +89,21 @@ def gambler_statistics(interaction: Interaction, gambler: Gambler) -> Embed:
         title=f"🎲 {interaction.user.display_name} 🎲",
         color=Color.blurple()
     )
-    red_bets = [bet for bet in gambler.bets if bet.bet_on == 'RED']
-    red_correct = len([bet for bet in red_bets if bet.is_correct])
-    red_wrong = len(red_bets) - red_correct
-    red_percent = f"{red_correct/len(red_bets)*100:.2f}%" if len(red_bets) > 0 else "N/A"
+    stats: GamblerStats = gambler.stats or GamblerStats.empty(gambler.id)
+    red_bets, red_correct = stats.red_bets, stats.red_wins
+    red_wrong = red_bets - red_correct
+    red_percent = f"{red_correct/red_bets*100:.2f}%" if red_bets > 0 else "N/A"
 
-    green_bets = [bet for bet in gambler.bets if bet.bet_on == 'GREEN']
-    green_correct = len([bet for bet in green_bets if bet.is_correct])
-    green_wrong = len(green_bets) - green_correct
-    green_percent = f"{green_correct/len(green_bets)*100:.2f}%" if len(green_bets) > 0 else "N/A"
+    green_bets, green_correct = stats.green_bets, stats.green_wins
+    green_wrong = green_bets - green_correct
+    green_percent = f"{green_correct/green_bets*100:.2f}%" if green_bets > 0 else "N/A"
 
-    black_bets = [bet for bet in gambler.bets if bet.bet_on == 'BLACK']
-    black_correct = len([bet for bet in black_bets if bet.is_correct])
-    black_wrong = len(black_bets) - black_correct
-    black_percent = f"{black_correct/len(black_bets)*100:.2f}%" if len(black_bets) > 0 else "N/A"
+    black_bets, black_correct = stats.black_bets, stats.black_wins
+    black_wrong = black_bets - black_correct
+    black_percent = f"{black_correct/black_bets*100:.2f}%" if black_bets > 0 else "N/A"
+
+    streak = stats.current_streak
+    streak_text = f"{streak} won" if streak > 0 else f"{-streak} lost" if streak < 0 else "-"
 
     # Add gambler stats
     embed.add_field(name="💰 Balance", value=f"**`${gambler.balance:.2f}`**", inline=True)
@@ -116,9 +118,9 @@ def gambler_statistics(interaction: Interaction, gambler: Gambler) -> Embed:
         name="🎰 Rounds Played",
         value=(
             "```diff\n"
-            f"- {len(red_bets)}|{red_correct}-{red_wrong}  ({red_percent})\n"
-            f"+ {len(green_bets)}|{green_correct}-{green_wrong}  ({green_percent})\n"
-            f"  {len(black_bets)}|{black_correct}-{black_wrong}  ({black_percent})\n"
+            f"- {red_bets}|{red_correct}-{red_wrong}  ({red_percent})\n"
+            f"+ {green_bets}|{green_correct}-{green_wrong}  ({green_percent})\n"
+            f"  {black_bets}|{black_correct}-{black_wrong}  ({black_percent})\n"
             "```"
         ),
         inline=False
@@ -127,8 +129,10 @@ def gambler_statistics(interaction: Interaction, gambler: Gambler) -> Embed:
     embed.add_field(
         name="🎲 Total",
         value=(
-            f"**Rounds Played**: {len(gambler.bets)}\n"
-            f"**Total Bet Placed**: `${sum([bet.amount for bet in gambler.bets]):.2f}`"
+            f"**Rounds Played**: {stats.total_bets}\n"
+            f"**Total Bet Placed**: `${stats.total_wagered:.2f}`\n"
+            f"**Net Profit**: `${stats.net_profit:.2f}`\n"
+            f"**Streak**: {streak_text} (best {stats.longest_win_streak} won, worst {stats.longest_loss_streak} lost)"
         ),
         inline=False
     )
@@ -190,7 +194,7 @@ def show_items(interaction: Interaction, items: list[Item], page_size:int=10) ->
             title=item.name,
             # **Float:** {item.float_val}
             description=f'''
-                **Price:** ${round(item.buff_price, 2)}
+                **Price:** ${item.buff_price}
             ''',
             color=Color.gold(),
             timestamp=datetime.now()
@@ -202,3 +206,37 @@ def show_items(interaction: Interaction, items: list[Item], page_size:int=10) ->
 
     return embeds_pages
 
+def item_price(name: str, lowest_sell: float, highest_buy: float) -> Embed:
+    embed = Embed(title=name, color=Color.gold(), timestamp=datetime.now())
+    embed.add_field(name="Lowest Sell", value=f"${lowest_sell}" if lowest_sell is not None else "-", inline=True)
+    embed.add_field(name="Highest Buy", value=f"${highest_buy}" if highest_buy is not None else "-", inline=True)
+    embed.set_footer(text="Buff163")
+    return embed
+
+def bot_stats() -> Embed:
+    """What the metrics collected since the bot started, for the /bot_stats admin command."""
+    embed = Embed(title="📊 Bot Stats 📊", color=Color.blurple(), timestamp=datetime.now())
+    if not metrics.ENABLED:
+        embed.description = "Metrics are off. Set `METRICS=1` or `METRICS_PORT` and restart the bot to collect them."
+        return embed
+
+    def ms(seconds: float) -> str:
+        return f"{seconds*1000:.1f}"
+
+    def rows(summaries: dict, limit: int = 8) -> str:
+        # Busiest first: the series with the most time spent in them
+        ordered = sorted(summaries.items(), key=lambda item: -item[1]["count"] * item[1]["mean"])[:limit]
+        lines = [f"{'/'.join(map(str, labels)) or '-':<26} {summary['count']:>7} {ms(summary['mean']):>7} {ms(summary['p99']):>8}" for labels, summary in ordered]
+        return "```\n" + f"{'':<26} {'count':>7} {'mean ms':>7} {'p99 ms':>8}\n" + ("\n".join(lines) or "-") + "\n```"
+
+    uptime = timedelta(seconds=int(datetime.now().timestamp() - metrics.STARTED_AT))
+    lag = metrics.LOOP_LAG.summary().get((), {"p99": 0.0, "max": 0.0})
+    embed.description = (f"Up for **{uptime}**, **{int(metrics.ROUNDS.total())}** rounds played. "
+                         f"Event loop lag p99 **{ms(lag['p99'])} ms**, max **{ms(lag['max'])} ms**.")
+    embed.add_field(name="🗄️ Database", value=rows(metrics.DB_CALLS.summary()), inline=False)
+    embed.add_field(name="🎰 Round Phases", value=rows(metrics.ROUND_PHASES.summary()), inline=False)
+    embed.add_field(name="💬 Discord Edits", value=rows(metrics.DISCORD_EDITS.summary()) +
+                    f"\n429s: **{int(metrics.DISCORD_RATE_LIMITS.total())}**, waited **{metrics.DISCORD_RETRY_AFTER.total():.1f}s**", inline=False)
+    embed.add_field(name="🌐 HTTP", value=rows(metrics.HTTP_REQUESTS.summary()) +
+                    f"\n429s: **{int(metrics.HTTP_RATE_LIMITS.total())}**", inline=False)
+    return embed
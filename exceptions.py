@@ -8,4 +8,16 @@ class NoGamblerException(Exception):
 
 class TradeURLMissingException(Exception):
     def __init__(self, *args):
-        super().__init__(*args)
\ No newline at end of file
+        super().__init__(*args)
+
+class BettingClosedException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+class DuplicateBetException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
+
+class StaleLeaseException(Exception):
+    def __init__(self, *args):
+        super().__init__(*args)
@@ -0,0 +1,124 @@
+import threading
+from bisect import bisect_left, insort
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i+3] for i in range(len(text) - 2)}
+
+class GamblerIndex():
+    """In-memory search over gambler names and ids, so lookups never touch the database.
+
+    Names are kept in a sorted list for bisect prefix matches and in trigram posting sets for
+    substring matches, ids in a sorted list of their digits for id prefix matches. The database
+    keeps it in sync as gamblers are created and deleted.
+    """
+    def __init__(self):
+        self.loaded = False
+        self._names: dict[int, str] = {}
+        self._sorted_names: list[tuple[str, int]] = []
+        self._sorted_ids: list[str] = []
+        self._postings: dict[str, set[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    def __repr__(self):
+        return f"GamblerIndex Gamblers={len(self._names)}, Loaded={self.loaded}"
+
+    def load(self, gamblers: list[tuple[int, str]]):
+        """Replace the contents with (id, name) pairs."""
+        with self._lock:
+            self._names = {}
+            self._postings = {}
+            for gambler_id, name in gamblers:
+                self._names[gambler_id] = name
+                for trigram in trigrams(name.lower()):
+                    self._postings.setdefault(trigram, set()).add(gambler_id)
+            self._sorted_names = sorted((name.lower(), gambler_id) for gambler_id, name in self._names.items())
+            self._sorted_ids = sorted(str(gambler_id) for gambler_id in self._names)
+            self.loaded = True
+
+    def add(self, gambler_id: int, name: str):
+        with self._lock:
+            if gambler_id in self._names:
+                self._remove(gambler_id)
+            self._names[gambler_id] = name
+            insort(self._sorted_names, (name.lower(), gambler_id))
+            insort(self._sorted_ids, str(gambler_id))
+            for trigram in trigrams(name.lower()):
+                self._postings.setdefault(trigram, set()).add(gambler_id)
+
+    def remove(self, gambler_id: int):
+        with self._lock:
+            if gambler_id in self._names:
+                self._remove(gambler_id)
+
+    def _remove(self, gambler_id: int):
+        name = self._names.pop(gambler_id)
+        entry = (name.lower(), gambler_id)
+        del self._sorted_names[bisect_left(self._sorted_names, entry)]
+        del self._sorted_ids[bisect_left(self._sorted_ids, str(gambler_id))]
+        for trigram in trigrams(name.lower()):
+            posting = self._postings[trigram]
+            posting.discard(gambler_id)
+            if not posting:
+                del self._postings[trigram]
+
+    def get_name(self, gambler_id: int) -> str:
+        return self._names.get(gambler_id)
+
+    def find_by_name(self, name: str) -> int:
+        """Id of a gambler with exactly this name, or None."""
+        key = name.lower()
+        with self._lock:
+            position = bisect_left(self._sorted_names, (key, -1))
+            while position < len(self._sorted_names) and self._sorted_names[position][0] == key:
+                gambler_id = self._sorted_names[position][1]
+                if self._names[gambler_id] == name:
+                    return gambler_id
+                position += 1
+        return None
+
+    def search(self, query: str, limit: int = 25) -> list[tuple[int, str]]:
+        """(id, name) of gamblers whose name starts with or contains the query, or whose id starts with it.
+
+        Name prefix matches come first, in name order. Queries under 3 characters also match anywhere in an id.
+        """
+        key = query.lower().strip()
+        with self._lock:
+            if not key:
+                return [(gambler_id, self._names[gambler_id]) for _, gambler_id in self._sorted_names[:limit]]
+
+            found = []
+            position = bisect_left(self._sorted_names, (key, -1))
+            while position < len(self._sorted_names) and len(found) < limit and self._sorted_names[position][0].startswith(key):
+                found.append(self._sorted_names[position][1])
+                position += 1
+
+            if len(found) < limit and key.isdigit():
+                position = bisect_left(self._sorted_ids, key)
+                while position < len(self._sorted_ids) and len(found) < limit and self._sorted_ids[position].startswith(key):
+                    gambler_id = int(self._sorted_ids[position])
+                    if gambler_id not in found:
+                        found.append(gambler_id)
+                    position += 1
+
+            if len(found) < limit and len(key) < 3:
+                # No trigram fits in the key, scan for it instead. Substrings that short are cheap to look for
+                for name, gambler_id in self._sorted_names:
+                    if len(found) >= limit:
+                        break
+                    if gambler_id not in found and (key in name or key in str(gambler_id)):
+                        found.append(gambler_id)
+            elif len(found) < limit:
+                postings = sorted((self._postings.get(trigram, set()) for trigram in trigrams(key)), key=len)
+                candidates = set.intersection(*postings) if postings else set()
+                for gambler_id in sorted(candidates, key=lambda gambler_id: self._names[gambler_id].lower()):
+                    if len(found) >= limit:
+                        break
+                    if gambler_id not in found and key in self._names[gambler_id].lower():
+                        found.append(gambler_id)
+
+            return [(gambler_id, self._names[gambler_id]) for gambler_id in found]
+
+GAMBLER_INDEX = GamblerIndex()
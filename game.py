@@ -1,7 +1,6 @@
-import requests
 import uuid
-import random
 from emojis import Emoji
+from results import ResultPool, CSRNGSource, SystemSource
 
 class Results():
     GREEN = "GREEN"
@@ -11,6 +10,19 @@ class Results():
 RED_MULTIPLIER = 2
 BLACK_MULTIPLIER = 2
 GREEN_MULTIPLIER = 14
+MULTIPLIERS = {
+    Results.RED: RED_MULTIPLIER,
+    Results.BLACK: BLACK_MULTIPLIER,
+    Results.GREEN: GREEN_MULTIPLIER,
+}
+XP_PER_DOLLAR = 100  # XP awarded on settlement for each dollar bet
+
+def payout(stake, bet_on:str, is_correct:bool):
+    """What a bet pays back, the stake included. Multipliers are whole numbers, so a stake in cents pays whole cents."""
+    return stake * MULTIPLIERS.get(bet_on, 0) if is_correct else 0
+
+def bet_xp(stake_cents:int) -> int:
+    return stake_cents * XP_PER_DOLLAR // 100
 
 PROGRESS_BAR_LENGTH = 24
 PROGRESS_BAR = Emoji.PROGRESS_BAR.EDGE + Emoji.PROGRESS_BAR.FRONT_EDGE * (PROGRESS_BAR_LENGTH-1)
@@ -26,6 +38,7 @@ ANIMATION_DURATION = 10
 FRAME_RATE = 5
 TOTAL_FRAMES = ANIMATION_DURATION * FRAME_RATE
 SLEEP_DURATION = 1 / FRAME_RATE
+RENDER_INTERVAL = 1.0  # Minimum seconds between two edits of the roulette message
 
 GREEN_INTERVAL = [0]
 RED_INTERVAL = [1, 2, 3, 4, 5, 6, 7]
@@ -50,18 +63,19 @@ NUMBER_COLOR_MAPPING = {
     14:Results.BLACK,
 }
 
+# Results are drawn from a pre-fetched pool, csrng.net first and the local CSPRNG when it is down
+RESULT_POOL = ResultPool([CSRNGSource(), SystemSource()])
+
 def getNewRoundResult() -> int:
-    try:
-        response = requests.get("https://csrng.net/csrng/csrng.php?min=1&max=1500000").json()
-        result = response[0].get("random")
-        result = result % 15
-        return result
-    except Exception as e:
-        print(f"Error fetching new round result: {e}")
-        result = random.randint(0, 14)
-        return result
+    return RESULT_POOL.draw()
     
-def getNewRoundID() -> str:
+def getNewRoundID(table_id:int = None, slot:int = None) -> str:
+    """A random id, or for a round played in a slot of the shared round clock the id of that slot.
+
+    Every shard derives the same id for the same table and slot, so a round can only be created once.
+    """
+    if slot is not None:
+        return f"{table_id}-{slot}"
     return str(uuid.uuid4())
 
 def set_sequence(midpoint:int) -> list[str]:
@@ -78,4 +92,40 @@ def set_sequence(midpoint:int) -> list[str]:
     else:
         sequence = ROULETTE_SEQUENCE[start_index:] + ROULETTE_SEQUENCE[:end_index]
     
-    return sequence
\ No newline at end of file
+    return sequence
+
+# ---------------------------- SPIN ANIMATION ---------------------------- #
+# The wheel has 15 positions and a fixed frame schedule, so every window and every spin is built once at import
+# and a spin only looks its frames up.
+EXTRA_ROTATIONS = (1, 2)
+
+ROULETTE_WINDOWS = {num: " ".join(Emoji.roulette_values.get(window_num) for window_num in set_sequence(num)) for num in ROULETTE_SEQUENCE}
+
+def _spin_plan(last_result:int, result:int, extra_rotations:int) -> tuple:
+    sequence_length = len(ROULETTE_SEQUENCE)
+    start_index = ROULETTE_SEQUENCE.index(last_result)
+    final_index = ROULETTE_SEQUENCE.index(result)
+
+    # Calculate the total distance with extra rotations
+    forward_distance = (final_index - start_index) % sequence_length
+    total_distance = forward_distance + (sequence_length * extra_rotations)
+
+    frames = []
+    for frame in range(TOTAL_FRAMES):
+        progress = 1 - (1 - frame / TOTAL_FRAMES) ** 2  # Ease out
+        position = round(start_index + progress * total_distance) % sequence_length
+        if frame == TOTAL_FRAMES - 1:
+            position = final_index  # Ensure the final position matches the target
+        if frame % FRAME_RATE == 0 or frame == TOTAL_FRAMES - 1:
+            frames.append(ROULETTE_WINDOWS[ROULETTE_SEQUENCE[position]])
+        else:
+            frames.append(None)
+    return tuple(frames)
+
+# Rendered window of every frame (None for frames that are not drawn) keyed by (last result, result, extra rotations)
+SPIN_PLANS = {
+    (last_result, result, extra_rotations): _spin_plan(last_result, result, extra_rotations)
+    for last_result in ROULETTE_SEQUENCE
+    for result in ROULETTE_SEQUENCE
+    for extra_rotations in EXTRA_ROTATIONS
+}
\ No newline at end of file
@@ -0,0 +1,208 @@
+import asyncio
+import time
+
+import aiohttp
+
+import database
+import metrics
+from money import to_money
+from price_cache import PRICE_CACHE, PriceCache
+
+STEAM_INVENTORY_URL = "https://steamcommunity.com/inventory/{steam_id}/730/2"
+STEAM_IMAGE_URL = "https://steamcommunity-a.akamaihd.net/economy/image/"
+STEAM_TIMEOUT = 20
+INVENTORY_PAGE_SIZE = 500  # Items per Steam inventory request
+REFRESH_WORKERS = 4
+
+def parse_inventory(data: dict, steam_id: str) -> list[dict]:
+    """Join the `assets` of a Steam inventory response with their `descriptions`, one row per asset id.
+
+    Rows carry every field of database.ITEM_FIELDS, `buff_price` is left for the caller to fill in.
+    """
+    descriptions = {(item_data.get("classid"), item_data.get("instanceid")): item_data for item_data in data.get("descriptions") or []}
+    items = []
+    for asset in data.get("assets") or []:
+        item_data = descriptions.get((asset.get("classid"), asset.get("instanceid")))
+        if not item_data:
+            continue
+        asset_id = str(asset.get("assetid"))
+        name: str = item_data.get("market_hash_name")
+        shortname = item_data.get("name") or ""
+        if name.startswith(shortname):
+            exterior = name[len(shortname):].strip().replace("(", "").replace(")", "") or None
+        else:
+            exterior = None
+
+        inspect_link = None
+        try:
+            inspect_link = item_data.get("actions")[0].get("link").replace("%owner_steamid%", steam_id).replace("%assetid%", asset_id)
+        except Exception:
+            pass
+
+        tradable_date = None
+        owner_descriptions = item_data.get("owner_descriptions") or []
+        if len(owner_descriptions) > 1:
+            tradable_date = owner_descriptions[1].get("value")
+
+        items.append({
+            "asset_id": asset_id,
+            "name": name,
+            "exterior": exterior,
+            "is_tradable": bool(item_data.get("tradable")),
+            "tradable_date": tradable_date,
+            "inspect_link": inspect_link,
+            "image_url": STEAM_IMAGE_URL + item_data.get("icon_url", ""),
+            "buff_price": None,
+        })
+    return items
+
+async def stream_inventory(steam_id: str, page_size: int = INVENTORY_PAGE_SIZE, http: aiohttp.ClientSession = None):
+    """Yield a Steam inventory one page of parsed items at a time, following the `last_assetid` cursor.
+
+    Only one page is held in memory however large the inventory is.
+    """
+    own_session = http is None
+    http = http or aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=STEAM_TIMEOUT))
+    try:
+        params = {"l": "english", "count": str(page_size)}
+        while True:
+            started = time.perf_counter()
+            async with http.get(STEAM_INVENTORY_URL.format(steam_id=steam_id), params=params) as response:
+                if metrics.ENABLED:
+                    metrics.HTTP_REQUESTS.observe(time.perf_counter() - started, "steam", response.status)
+                    if response.status == 429:
+                        metrics.HTTP_RATE_LIMITS.inc("steam")
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+            if not data:
+                return
+            yield parse_inventory(data, steam_id)
+            if not data.get("more_items") or not data.get("last_assetid"):
+                return
+            params["start_assetid"] = data["last_assetid"]
+    finally:
+        if own_session:
+            await http.close()
+
+async def refresh_user_items(gambler_id: int, cache: PriceCache = None, progress=None, page_size: int = INVENTORY_PAGE_SIZE):
+    """Stream the gambler's Steam inventory page by page, pricing each page through the shared price cache
+    and saving what changed as it arrives. Items that are no longer in the inventory are deleted at the end,
+    only once every page has been fetched. A failed request is raised after the pages saved so far.
+
+    `progress` is called with a short description of each stage.
+    """
+    cache = cache or PRICE_CACHE
+    progress = progress or (lambda stage: None)
+    steam_id = await database.run(database.get_steam_id, gambler_id)
+    progress("Fetching your Steam inventory...")
+
+    seen = set()
+    inserted = updated = 0
+    try:
+        async for items in stream_inventory(steam_id, page_size):
+            prices = await cache.get_prices(item["name"] for item in items)
+            for item in items:
+                try:
+                    item["buff_price"] = to_money(prices[item["name"]][1] * 0.95)
+                except (KeyError, TypeError):
+                    pass
+            page_inserted, page_updated = await database.run(database.save_user_items, gambler_id, items)
+            inserted += page_inserted
+            updated += page_updated
+            seen.update(item["asset_id"] for item in items)
+            progress(f"Priced {len(seen)} items...")
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        # Without the whole inventory we cannot tell which items are gone, keep them and fail the refresh
+        print(f"Error fetching the items of {gambler_id} after {len(seen)} items. {e}")
+        raise
+
+    progress("Saving your items...")
+    deleted = await database.run(database.delete_missing_items, gambler_id, seen)
+    print(f"Items of {gambler_id} refreshed: {inserted} new, {updated} changed, {deleted} gone.")
+
+# ---------------------------- REFRESH QUEUE ---------------------------- #
+class RefreshJob():
+    def __init__(self, gambler_id: int):
+        self.gambler_id = gambler_id
+        self.stage = "Queued..."
+        self.listeners = []
+        self.future = asyncio.get_running_loop().create_future()
+
+    def __repr__(self):
+        return f"RefreshJob Gambler={self.gambler_id}, Stage={self.stage}"
+
+    def set_stage(self, stage: str):
+        self.stage = stage
+        for listener in self.listeners:
+            listener(self)
+
+    def add_listener(self, listener):
+        """`listener(job)` is called on every stage change."""
+        self.listeners.append(listener)
+
+    async def wait(self):
+        """Wait for the refresh to finish, raising whatever it raised."""
+        return await asyncio.shield(self.future)
+
+class RefreshQueue():
+    """Runs inventory refreshes on a pool of worker tasks.
+
+    Submitting a gambler whose refresh is already queued or running returns that job instead of
+    starting another one. Workers start with the first submission.
+    """
+    def __init__(self, workers: int = REFRESH_WORKERS, refresh=refresh_user_items):
+        self.workers = workers
+        self.refresh = refresh
+        self.completed = 0
+        self.failed = 0
+
+        self._queue: asyncio.Queue = None
+        self._jobs: dict[int, RefreshJob] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __repr__(self):
+        return f"RefreshQueue Workers={self.workers}, Jobs={len(self._jobs)}, Completed={self.completed}, Failed={self.failed}"
+
+    def start(self):
+        if not self._tasks:
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, gambler_id: int) -> RefreshJob:
+        self.start()
+        job = self._jobs.get(gambler_id)
+        if job:
+            return job
+        job = RefreshJob(gambler_id)
+        self._jobs[gambler_id] = job
+        self._queue.put_nowait(job)
+        ahead = self._queue.qsize() - 1
+        job.set_stage(f"Queued, {ahead} refreshes ahead of you..." if ahead else "Queued...")
+        return job
+
+    async def _work(self):
+        while True:
+            job: RefreshJob = await self._queue.get()
+            try:
+                await self.refresh(job.gambler_id, progress=job.set_stage)
+                self.completed += 1
+                job.future.set_result(None)
+                job.set_stage("Done.")
+            except Exception as e:
+                self.failed += 1
+                job.future.set_exception(e)
+                job.set_stage("Failed.")
+            finally:
+                del self._jobs[job.gambler_id]
+                self._queue.task_done()
+
+REFRESH_QUEUE = RefreshQueue()
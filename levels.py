@@ -0,0 +1,18 @@
+from bisect import bisect_right
+from decimal import Decimal
+
+from money import to_money
+from settings import LEVELS
+
+# levels.json as parallel arrays indexed by level: the total XP a level starts at and its daily reward
+LEVEL_XP: list[int] = [level["total_xp"] for level in LEVELS]
+LEVEL_DAILY: list[Decimal] = [to_money(level["daily"]) for level in LEVELS]
+MIN_LEVEL = 1
+MAX_LEVEL = len(LEVELS) - 1
+
+def level_for_xp(xp: int, level: int = MIN_LEVEL) -> int:
+    """The level a gambler with `xp` total XP is at, never below their current `level` and at most MAX_LEVEL."""
+    return min(MAX_LEVEL, max(level, bisect_right(LEVEL_XP, xp) - 1))
+
+def daily_for_level(level: int) -> Decimal:
+    return LEVEL_DAILY[min(max(level, 0), MAX_LEVEL)]
@@ -6,7 +6,7 @@ from datetime import datetime, timezone, timedelta
 import time
 from dotenv import load_dotenv, set_key
 
-from discord import ActionRow, Intents, Embed, Color, Interaction, SelectOption
+from discord import ActionRow, Intents, Embed, Color, Interaction, SelectOption, HTTPException
 from discord import app_commands
 from discord.enums import ButtonStyle
 from discord.ext import commands
@@ -17,12 +17,13 @@ from discord.message import Message
 import requests
 from math import ceil
 from emojis import Emoji
-from exceptions import InsufficientBalanceException, NoGamblerException
+from exceptions import InsufficientBalanceException, NoGamblerException, TradeURLMissingException
 import embed_messages
 import game
 from database import Gambler, Item
 import settings
 import database
+import inventory
 
 MARKET_CHANNEL_ID = 1324163837880045739
 
@@ -38,7 +39,7 @@ class BringMyInventoryButton(Button):
 
     async def callback(self, interaction: Interaction):
         try:
-            gambler: Gambler = database.get_gambler_by_id(interaction.user.id)
+            gambler: Gambler = await database.run(database.get_gambler_by_id, interaction.user.id)
         except NoGamblerException:
             await interaction.response.send_message(
                 "You are not registered as a gambler yet! Click on the `🆕 Register` button in the #roulette channel to start playing.",
@@ -46,9 +47,30 @@ class BringMyInventoryButton(Button):
             )
             return
 
-        await interaction.response.send_message("Refreshing...", delete_after=3)
-        database.refresh_user_items(gambler.id)
-        items = database.get_items_by_gambler(gambler)
+        # The refresh runs on the job queue, answer right away and post the items when it is done
+        job = inventory.REFRESH_QUEUE.submit(gambler.id)
+        await interaction.response.send_message(job.stage, ephemeral=True)
+        job.add_listener(lambda job: asyncio.create_task(self.show_progress(interaction, job)))
+        asyncio.create_task(self.show_items(interaction, gambler, job))
+
+    async def show_progress(self, interaction: Interaction, job: inventory.RefreshJob):
+        try:
+            await interaction.edit_original_response(content=job.stage)
+        except HTTPException as e:
+            print(f"Error showing the refresh progress of {job.gambler_id}: {e}")
+
+    async def show_items(self, interaction: Interaction, gambler: Gambler, job: inventory.RefreshJob):
+        try:
+            await job.wait()
+        except TradeURLMissingException as e:
+            await interaction.followup.send(str(e), ephemeral=True)
+            return
+        except Exception as e:
+            print(f"Error refreshing the items of {gambler.name}: {e}")
+            await interaction.followup.send("Your inventory could not be refreshed, try again later.", ephemeral=True)
+            return
+
+        items = await database.run(database.get_items_by_gambler, gambler)
         items = [item for item in items if item.buff_price]
         if not items:
             await interaction.followup.send("You have no items in your inventory.", ephemeral=True)
@@ -63,7 +85,7 @@ class BringMyInventoryButton(Button):
             return [
                 SelectOption(
                     label=f"{item.name} (${item.buff_price})",
-                    value=str(item.id),
+                    value=item.asset_id,
                     description=f"${item.buff_price}"
                 )
                 for item in items[page_num*item_per_page:(page_num+1)*item_per_page]
@@ -83,8 +105,8 @@ class BringMyInventoryButton(Button):
                 self.options = get_select_options(new_page_num)
 
             async def callback(self, select_interaction: Interaction):
-                selected_item_id = int(self.values[0])
-                selected_item = next(item for item in items if item.id == selected_item_id)
+                selected_asset_id = self.values[0]
+                selected_item = next(item for item in items if item.asset_id == selected_asset_id)
                 await select_interaction.response.send_message(
                     f"You selected {selected_item.name} for deposit. You will get ${selected_item.buff_price}", ephemeral=True, delete_after=5)
                 # Add deposit logic here
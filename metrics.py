@@ -0,0 +1,284 @@
+"""Counters and timers of the bot's hot paths, served in the Prometheus text format.
+
+Metrics are on when METRICS_PORT is set (the /metrics endpoint listens on METRICS_HOST, local only by
+default) or when METRICS=1 (only /bot_stats reads them). Instrumented code checks `ENABLED` before it
+takes a timestamp, so with metrics off every probe costs one attribute lookup.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+METRICS_PORT = int(os.getenv("METRICS_PORT") or 0)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+ENABLED = METRICS_PORT > 0 or os.getenv("METRICS") == "1"
+LAG_INTERVAL = 0.5  # Seconds between two event loop lag probes
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+STARTED_AT = time.time()
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+# ---------------------------- METRICS ---------------------------- #
+class Metric():
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()  # Observed from the event loop, the database thread and the result pool thread
+        REGISTRY.register(self)
+
+    def __repr__(self):
+        return f"{type(self).__name__} Name={self.name}, Labels={self.labels}"
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        super().__init__(name, help, labels)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def move(self, source: tuple, target: tuple, amount: float = 1):
+        """Count `amount` already counted under the `source` labels under `target` instead."""
+        with self._lock:
+            self.values[source] = self.values.get(source, 0) - amount
+            self.values[target] = self.values.get(target, 0) + amount
+
+    def total(self) -> float:
+        return sum(self.values.values())
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = dict(self.values)
+        return super().render() + [f"{self.name}{_format_labels(self.labels, key)} {value:g}" for key, value in sorted(values.items())]
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        super().__init__(name, help, labels)
+        self.values: dict[tuple, float] = {}
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+    def render(self) -> list[str]:
+        return super().render() + [f"{self.name}{_format_labels(self.labels, key)} {value:g}" for key, value in sorted(self.values.items())]
+
+class HistogramSeries():
+    __slots__ = ("counts", "sum", "count", "max")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * (buckets + 1)  # The last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets of seconds, per combination of label values."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self.series: dict[tuple, HistogramSeries] = {}
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = HistogramSeries(len(self.buckets))
+            series.counts[bisect_left(self.buckets, value)] += 1
+            series.sum += value
+            series.count += 1
+            series.max = max(series.max, value)
+
+    def quantile(self, q: float, *labels) -> float:
+        """Estimate of the q-quantile, interpolated inside the bucket it falls in like Prometheus does."""
+        series = self.series.get(labels)
+        if series is None or not series.count:
+            return 0.0
+        rank = q * series.count
+        seen = 0
+        for index, count in enumerate(series.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index-1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else series.max
+                return min(series.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+        return series.max
+
+    def summary(self) -> dict[tuple, dict]:
+        """Count, mean, p50, p99 and max of each series, in seconds."""
+        with self._lock:
+            return {
+                labels: {"count": series.count, "mean": series.sum / series.count if series.count else 0.0,
+                         "p50": self.quantile(0.5, *labels), "p99": self.quantile(0.99, *labels), "max": series.max}
+                for labels, series in self.series.items()
+            }
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self._lock:
+            for labels, series in sorted(self.series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), series.counts):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {series.sum:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {series.count}")
+        return lines
+
+class Registry():
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def __repr__(self):
+        return f"Registry Metrics={len(self.metrics)}, Enabled={ENABLED}"
+
+    def register(self, metric: Metric):
+        self.metrics[metric.name] = metric
+
+    def render(self) -> str:
+        UPTIME.set(time.time() - STARTED_AT)
+        return "\n".join(line for metric in self.metrics.values() for line in metric.render()) + "\n"
+
+REGISTRY = Registry()
+
+UPTIME = Gauge("roulette_uptime_seconds", "Seconds since the bot process started.")
+DB_CALLS = Histogram("roulette_db_call_seconds", "Time a database call runs on the database thread.", ("function",))
+DB_WAIT = Histogram("roulette_db_wait_seconds", "Time a database call waits for the database thread.", ("function",))
+DISCORD_EDITS = Histogram("roulette_discord_edit_seconds", "Time of a message edit, rate limit waits included.", ("message",))
+DISCORD_ERRORS = Counter("roulette_discord_edit_errors_total", "Message edits that failed.", ("message", "status"))
+DISCORD_RATE_LIMITS = Counter("roulette_discord_rate_limits_total", "429 responses from Discord.", ("scope",))
+DISCORD_RETRY_AFTER = Counter("roulette_discord_retry_after_seconds_total", "Seconds Discord told the bot to wait after a 429.", ("scope",))
+HTTP_REQUESTS = Histogram("roulette_http_request_seconds", "Time of a request to an outside service.", ("service", "status"))
+HTTP_RATE_LIMITS = Counter("roulette_http_rate_limits_total", "429 responses from outside services.", ("service",))
+ROUND_PHASES = Histogram("roulette_round_phase_seconds", "Time a table spends in each phase of a round.", ("phase",))
+ROUNDS = Counter("roulette_rounds_total", "Rounds played to the end.", ("table",))
+LOOP_LAG = Histogram("roulette_event_loop_lag_seconds", "How late the event loop wakes a sleeping task.")
+
+
+# ---------------------------- PROBES ---------------------------- #
+def timed_db_call(call, name: str):
+    """Wrap a database call to time its wait for the database thread and its run on it."""
+    queued = time.perf_counter()
+
+    def timed():
+        started = time.perf_counter()
+        DB_WAIT.observe(started - queued, name)
+        try:
+            return call()
+        finally:
+            DB_CALLS.observe(time.perf_counter() - started, name)
+    return timed
+
+class Laps():
+    """Times consecutive phases: each `lap` observes the time since the previous one under its name."""
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.last = time.perf_counter()
+
+    def lap(self, *labels):
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, *labels)
+        self.last = now
+
+class NoLaps():
+    def lap(self, *labels):
+        pass
+
+NO_LAPS = NoLaps()
+
+def laps(histogram: Histogram):
+    return Laps(histogram) if ENABLED else NO_LAPS
+
+class RateLimitLogHandler(logging.Handler):
+    """discord.py retries 429s itself and only logs them, the retry-after is the last argument of those records.
+
+    Every 429 is logged as "responded with 429", a global one is followed by a "Global rate limit" record for
+    the same response. That record re-labels the 429 counted just before instead of counting it again.
+    """
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self._last_route: float = None  # Retry-after of the last route 429, until a global record claims it
+
+    def emit(self, record: logging.LogRecord):
+        message = record.msg if isinstance(record.msg, str) else ""
+        try:
+            retry_after = float(record.args[-1])
+        except (TypeError, ValueError, IndexError):
+            retry_after = 0.0
+        if "responded with 429" in message:
+            DISCORD_RATE_LIMITS.inc("route")
+            DISCORD_RETRY_AFTER.inc("route", amount=retry_after)
+            self._last_route = retry_after
+        elif message.startswith("Global rate limit"):
+            # Both records are logged back to back on the event loop, no scrape sees the 429 in between
+            if self._last_route is not None:
+                DISCORD_RATE_LIMITS.move(("route",), ("global",))
+                DISCORD_RETRY_AFTER.move(("route",), ("global",), amount=self._last_route)
+            else:
+                DISCORD_RATE_LIMITS.inc("global")
+                DISCORD_RETRY_AFTER.inc("global", amount=retry_after)
+            self._last_route = None
+
+async def watch_loop_lag(interval: float = LAG_INTERVAL):
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - started - interval))
+
+
+# ---------------------------- ENDPOINT ---------------------------- #
+_tasks: set[asyncio.Task] = set()
+_runner = None
+
+async def start(host: str = METRICS_HOST, port: int = METRICS_PORT):
+    """Start probing the event loop, catching Discord's 429s and serving /metrics. Safe to call on every reconnect."""
+    global _runner
+    if not ENABLED or _tasks:
+        return
+    logging.getLogger("discord.http").addHandler(RateLimitLogHandler(level=logging.WARNING))
+    task = asyncio.create_task(watch_loop_lag())
+    _tasks.add(task)
+    if port:
+        from aiohttp import web
+
+        async def serve_metrics(request):
+            return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8", headers={"X-Content-Type-Options": "nosniff"})
+
+        app = web.Application()
+        app.router.add_get("/metrics", serve_metrics)
+        _runner = web.AppRunner(app, access_log=None)
+        await _runner.setup()
+        await web.TCPSite(_runner, host, port).start()
+        print(f"Metrics served at http://{host}:{port}/metrics")
+
+async def stop():
+    global _runner
+    for task in _tasks:
+        task.cancel()
+    _tasks.clear()
+    if _runner:
+        await _runner.cleanup()
+        _runner = None
@@ -0,0 +1,35 @@
+"""Exact money: amounts are stored as integer cents and handled in Python as Decimals of whole cents.
+
+Floats only enter at the edges (slash command arguments, levels.json, Buff prices) and are rounded to
+the cent there, so balances, stakes and payouts never accumulate binary rounding errors.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import Integer
+from sqlalchemy.types import TypeDecorator
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+def to_money(value) -> Decimal:
+    """A dollar amount (int, float, str or Decimal) rounded half up to whole cents."""
+    if isinstance(value, float):
+        value = repr(value)  # The shortest decimal that round-trips, 0.1 stays 0.1
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+def to_cents(value) -> int:
+    return int(to_money(value) * 100)
+
+def from_cents(cents: int) -> Decimal:
+    return (Decimal(int(cents)) / 100).quantize(CENT)
+
+class Money(TypeDecorator):
+    """A column of integer cents that reads and writes Decimal dollars."""
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_cents(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_cents(value)
@@ -0,0 +1,162 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+import buff
+import database
+from catalog import CATALOG
+
+PRICE_TTL = timedelta(hours=24)  # Prices younger than this are served without a request
+PRICE_STALE_TTL = timedelta(hours=24)  # Past the TTL, prices are served for this much longer while refreshed in the background
+PRICE_MISS_TTL = timedelta(hours=1)  # Names Buff has no price for are not asked for again before this
+PRICE_LRU_SIZE = 4096
+
+def utcnow() -> datetime:
+    # SQLite hands DateTime columns back without a timezone, keep every timestamp naive UTC so they compare
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class CachedPrice(NamedTuple):
+    lowest_sell: float
+    highest_buy: float
+    yuan_usd: float
+    fetched_at: datetime
+
+    @property
+    def missing(self) -> bool:
+        """Buff had no price for the name when it was fetched."""
+        return self.lowest_sell is None and self.highest_buy is None
+
+class PriceCache():
+    """Buff prices by market hash name: an in-memory LRU in front of the `item_prices` table.
+
+    Fresh prices are served as they are. Stale ones (past `ttl` but within `stale_ttl` after it) are
+    served too, while a background task refreshes them. Only missing or expired names wait on Buff.
+    Names Buff has no price for are remembered as misses for `miss_ttl`.
+    """
+    def __init__(self, client: buff.BuffPriceClient = None, ttl: timedelta = PRICE_TTL,
+                 stale_ttl: timedelta = PRICE_STALE_TTL, lru_size: int = PRICE_LRU_SIZE,
+                 miss_ttl: timedelta = PRICE_MISS_TTL):
+        self.client = client or buff.PRICE_CLIENT
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.miss_ttl = miss_ttl
+        self.lru_size = lru_size
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+        self._lru: OrderedDict[str, CachedPrice] = OrderedDict()
+        self._revalidating: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+
+    def __repr__(self):
+        return f"PriceCache Size={len(self._lru)}/{self.lru_size}, TTL={self.ttl}, Hits={self.hits}, Misses={self.misses}"
+
+    def _remember(self, name: str, price: CachedPrice):
+        self._lru[name] = price
+        self._lru.move_to_end(name)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    async def _lookup(self, names: list[str]) -> dict[str, CachedPrice]:
+        found = {}
+        unknown = []
+        for name in names:
+            if name in self._lru:
+                self._lru.move_to_end(name)
+                found[name] = self._lru[name]
+            else:
+                unknown.append(name)
+        if unknown:
+            rows = await database.run(database.get_item_prices, unknown)
+            for name, row in rows.items():
+                price = CachedPrice(row.lowest_sell, row.highest_buy, row.yuan_usd, row.fetched_at)
+                self._remember(name, price)
+                found[name] = price
+        return found
+
+    async def fetch(self, names) -> dict[str, CachedPrice]:
+        """Request the names from Buff now and store the prices. Names Buff has no price for are stored as misses and left out,
+        names Buff could not be asked about are left out and keep whatever is stored for them."""
+        goods_ids = {}
+        await CATALOG.ensure_built()
+        for name in names:
+            # Steam names that differ from Buff's only in marks, spacing or case still resolve to their item
+            match = CATALOG.resolve(name)
+            if match:
+                goods_ids[name] = match.goods_id
+        if not goods_ids:
+            return {}
+        prices_by_id = await self.client.get_prices(goods_ids.values())
+        fetched_at = utcnow()
+        prices = {}
+        for name, goods_id in goods_ids.items():
+            if prices_by_id[goods_id] is None:
+                continue
+            lowest_sell, highest_buy = prices_by_id[goods_id]
+            prices[name] = CachedPrice(lowest_sell, highest_buy, buff.YUANUSD, fetched_at)
+        await database.run(database.save_item_prices, {name: price[:2] for name, price in prices.items()}, buff.YUANUSD, fetched_at)
+        for name, price in prices.items():
+            self._remember(name, price)
+        return {name: price for name, price in prices.items() if not price.missing}
+
+    def _revalidate(self, names: list[str]):
+        names = [name for name in names if name not in self._revalidating]
+        if not names:
+            return
+        self._revalidating.update(names)
+
+        async def revalidate():
+            try:
+                await self.fetch(names)
+            except Exception as e:
+                print(f"Error revalidating {len(names)} prices: {e}")
+            finally:
+                self._revalidating.difference_update(names)
+
+        task = asyncio.create_task(revalidate())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def get_prices(self, names) -> dict[str, tuple[float, float]]:
+        """(lowest sell, highest buy) in USD for every name Buff has a price for."""
+        names = list(dict.fromkeys(names))
+        cached = await self._lookup(names)
+        now = utcnow()
+        prices = {}
+        stale = []
+        expired = []
+        for name in names:
+            price = cached.get(name)
+            age = now - price.fetched_at if price else None
+            if price and price.missing:
+                # Misses are not revalidated in the background, once expired they are asked for again
+                if age < self.miss_ttl:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                    expired.append(name)
+            elif price and age < self.ttl:
+                self.hits += 1
+                prices[name] = price
+            elif price and age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                prices[name] = price
+                stale.append(name)
+            else:
+                self.misses += 1
+                expired.append(name)
+
+        if stale:
+            self._revalidate(stale)
+        if expired:
+            prices.update(await self.fetch(expired))
+            for name in expired:
+                # Buff could not be reached, an expired price is still better than none
+                price = cached.get(name)
+                if name not in prices and price and not price.missing:
+                    prices[name] = price
+        return {name: (price.lowest_sell, price.highest_buy) for name, price in prices.items()}
+
+PRICE_CACHE = PriceCache()
@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+from discord import Embed
+from discord.message import Message
+from discord.ui import View
+
+import game
+import metrics
+
+class RenderScheduler():
+    """Owns a message and coalesces every change to it into at most one edit per interval.
+
+    Callers change the embed or view through the scheduler, which marks the message dirty.
+    A background task renders the latest state once the interval since the previous edit has
+    passed, so intermediate states (timer ticks, animation frames, table updates) that were
+    superseded before their turn are dropped instead of queueing up on the rate limit.
+    """
+    def __init__(self, message: Message, embed: Embed, view: View = None, interval: float = None, label: str = "roulette"):
+        self.message = message
+        self.embed = embed
+        self.view = view
+        self.interval = game.RENDER_INTERVAL if interval is None else interval
+        self.label = label  # Name of the message in the metrics
+        self.edits = 0
+        self.dropped = 0  # Changes superseded before they were rendered
+
+        self._dirty = asyncio.Event()
+        self._view_dirty = False
+        self._version = 0
+        self._rendered_version = 0
+        self._rendered = asyncio.Condition()
+        self._last_edit = 0
+        self._running = False
+        self._task: asyncio.Task = None
+
+    def __repr__(self):
+        return f"RenderScheduler Message={getattr(self.message, 'id', None)}, Edits={self.edits}, Dropped={self.dropped}"
+
+    # ----------------- CHANGES
+    def set_field(self, index: int, name: str, value: str, inline: bool = False):
+        self.embed.set_field_at(index=index, name=name, value=value, inline=inline)
+        self._mark()
+
+    def set_color(self, color):
+        self.embed.color = color
+        self._mark()
+
+    def set_view(self, view: View = None):
+        if view is not None:
+            self.view = view
+        self._view_dirty = True
+        self._mark()
+
+    def _mark(self):
+        if self._dirty.is_set():
+            self.dropped += 1
+        self._version += 1
+        self._dirty.set()
+
+    # ----------------- RENDERING
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._running = True
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # A task cancelled before it first ran never got to release the waiters of `flush`
+        self._running = False
+        async with self._rendered:
+            self._rendered.notify_all()
+
+    async def flush(self):
+        """Wait until every change made so far has been rendered. Returns at once when the scheduler is not running."""
+        version = self._version
+        async with self._rendered:
+            await self._rendered.wait_for(lambda: self._rendered_version >= version or not self._running)
+
+    async def _run(self):
+        try:
+            await self._render()
+        finally:
+            # Release whoever waits in `flush`, nothing is going to render their changes any more
+            self._running = False
+            async with self._rendered:
+                self._rendered.notify_all()
+
+    async def _render(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._dirty.wait()
+            wait = self._last_edit + self.interval - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            self._dirty.clear()
+            version = self._version
+            kwargs = {"embed": self.embed}
+            if self._view_dirty:
+                kwargs["view"] = self.view
+                self._view_dirty = False
+            started = time.perf_counter()
+            try:
+                await self.message.edit(**kwargs)
+                self.edits += 1
+            except Exception as e:
+                # HTTPException, but also OSError, RateLimited or aiohttp errors once discord.py gives up retrying.
+                # The next change is rendered in a fresh edit, so the scheduler keeps going whatever failed.
+                print(f"Error editing message {self.message.id}: {e}")
+                if "view" in kwargs:
+                    # Buttons are only sent when the view changed, send them again with the next edit
+                    self._view_dirty = True
+                if metrics.ENABLED:
+                    metrics.DISCORD_ERRORS.inc(self.label, getattr(e, "status", type(e).__name__))
+            if metrics.ENABLED:
+                metrics.DISCORD_EDITS.observe(time.perf_counter() - started, self.label)
+            self._last_edit = loop.time()
+
+            async with self._rendered:
+                self._rendered_version = version
+                self._rendered.notify_all()
@@ -0,0 +1,182 @@
+import random
+import secrets
+import threading
+import time
+from collections import deque
+
+import requests
+
+import metrics
+
+WHEEL_NUMBERS = 15  # Results are 0..14
+
+# ---------------------------- SOURCES ---------------------------- #
+class ResultSource():
+    """Somewhere round results come from. `fetch` returns `count` results in 0..14 or raises."""
+    name = "source"
+
+    def fetch(self, count: int) -> list[int]:
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__} Name={self.name}"
+
+class CSRNGSource(ResultSource):
+    name = "csrng"
+    URL = "https://csrng.net/csrng/csrng.php"
+
+    def __init__(self, timeout: float = 3):
+        self.timeout = timeout
+
+    def fetch(self, count: int) -> list[int]:
+        results = []
+        with requests.Session() as http:
+            for _ in range(count):
+                started = time.perf_counter()
+                try:
+                    response = http.get(self.URL, params={"min": 1, "max": 1500000}, timeout=self.timeout)
+                except requests.RequestException:
+                    if metrics.ENABLED:
+                        metrics.HTTP_REQUESTS.observe(time.perf_counter() - started, self.name, "error")
+                    raise
+                if metrics.ENABLED:
+                    metrics.HTTP_REQUESTS.observe(time.perf_counter() - started, self.name, response.status_code)
+                    if response.status_code == 429:
+                        metrics.HTTP_RATE_LIMITS.inc(self.name)
+                response.raise_for_status()
+                data = response.json()[0]
+                if data.get("status") != "success":
+                    raise ValueError(f"csrng returned {data}")
+                results.append(data.get("random") % WHEEL_NUMBERS)
+        return results
+
+class SystemSource(ResultSource):
+    """The operating system's CSPRNG."""
+    name = "system"
+
+    def fetch(self, count: int) -> list[int]:
+        return [secrets.randbelow(WHEEL_NUMBERS) for _ in range(count)]
+
+class SeededSource(ResultSource):
+    """A reproducible sequence of results, for tests and simulations."""
+    name = "seeded"
+
+    def __init__(self, seed: int = 0):
+        self.random = random.Random(seed)
+
+    def fetch(self, count: int) -> list[int]:
+        return [self.random.randrange(WHEEL_NUMBERS) for _ in range(count)]
+
+# ---------------------------- POOL ---------------------------- #
+class SourceHealth():
+    def __init__(self):
+        self.fetched = 0
+        self.batches = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error: str = None
+        self.last_latency: float = None
+        self.unhealthy_until = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "fetched": self.fetched,
+            "batches": self.batches,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "last_latency": self.last_latency,
+            "healthy": time.monotonic() >= self.unhealthy_until,
+        }
+
+class ResultPool():
+    """A buffer of pre-fetched round results, refilled in batches on a background thread.
+
+    `draw` never waits on the network: it pops a buffered result and, when the buffer runs low,
+    starts a refill. Sources are tried in order; one that fails is skipped for `failure_cooldown`
+    seconds. If the buffer is empty the result comes from `fallback` directly.
+    """
+    def __init__(self, sources: list[ResultSource], size: int = 50, low_watermark: int = 10, batch: int = 10,
+                 failure_cooldown: float = 60, fallback: ResultSource = None):
+        self.sources = list(sources)
+        self.size = size
+        self.low_watermark = low_watermark
+        self.batch = batch
+        self.failure_cooldown = failure_cooldown
+        self.fallback = fallback or SystemSource()
+        self.health = {source.name: SourceHealth() for source in self.sources}
+        self.draws = 0
+        self.fallback_draws = 0
+
+        self._results = deque()
+        self._lock = threading.Lock()
+        self._refilling = False
+
+    def __len__(self):
+        return len(self._results)
+
+    def __repr__(self):
+        return f"ResultPool Size={len(self._results)}/{self.size}, Sources={[source.name for source in self.sources]}"
+
+    def draw(self) -> int:
+        self.draws += 1
+        try:
+            result = self._results.popleft()
+        except IndexError:
+            self.fallback_draws += 1
+            result = self.fallback.fetch(1)[0]
+        if len(self._results) < self.low_watermark:
+            self.refill_async()
+        return result
+
+    def refill_async(self):
+        with self._lock:
+            if self._refilling:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill_and_release, name="result-pool", daemon=True).start()
+
+    def _refill_and_release(self):
+        try:
+            self.refill()
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def refill(self):
+        """Fetch batches until the pool is full or every source has failed."""
+        while len(self._results) < self.size:
+            results = self._fetch_batch(min(self.batch, self.size - len(self._results)))
+            if not results:
+                return
+            self._results.extend(results)
+
+    def _fetch_batch(self, count: int) -> list[int]:
+        for source in self.sources:
+            health = self.health[source.name]
+            if time.monotonic() < health.unhealthy_until:
+                continue
+            started = time.monotonic()
+            try:
+                results = source.fetch(count)
+            except Exception as e:
+                health.failures += 1
+                health.consecutive_failures += 1
+                health.last_error = str(e)
+                health.unhealthy_until = time.monotonic() + self.failure_cooldown
+                print(f"Result source {source.name} failed, failing over: {e}")
+                continue
+            health.last_latency = time.monotonic() - started
+            health.batches += 1
+            health.fetched += len(results)
+            health.consecutive_failures = 0
+            return results
+        return []
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self._results),
+            "draws": self.draws,
+            "fallback_draws": self.fallback_draws,
+            "sources": {name: health.as_dict() for name, health in self.health.items()},
+        }
@@ -0,0 +1,275 @@
+"""Sharded mode: several bot processes share the roulette tables, each running the tables it owns.
+
+Tables are assigned to the live shards with a consistent hash ring over their channel ids, so a shard
+joining or leaving only moves the tables it takes or gives up. Ownership is a lease in a store every
+shard can reach, here a SQLite file next to the database. Taking a lease bumps its token, which is
+recorded as the table's fence in the database before the new owner writes anything, so a shard that
+lost a table can no longer create, bet on or settle its rounds. Rounds start on the slots of a wall
+clock shared by every shard, and the id of a round is its table and slot, so a round is created once
+no matter which shard plays it and settled once through its `settled` flag.
+"""
+import asyncio
+import hashlib
+import math
+import os
+import socket
+import time
+from bisect import bisect_right
+
+from discord import HTTPException
+from sqlalchemy import create_engine, event, text
+
+import database
+import game
+from table import TableManager, RouletteTable, parse_tables
+
+LEASE_PATH = os.path.join(database.VOLUME_DIR, "leases.db")
+LEASE_TTL = 15  # Seconds a lease or a shard heartbeat stays valid without being renewed
+RENEW_INTERVAL = 5  # Seconds between two rebalances of a shard
+RING_REPLICAS = 64  # Points of each shard on the hash ring
+INDEX_REFRESH = 60  # Seconds between reloads of the gambler index, gamblers register on every shard
+ROUND_SLACK = 3  # Seconds of a clock slot left for the database and Discord on top of the round itself
+
+def ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing():
+    """Consistent hashing of keys onto nodes, each node placed at RING_REPLICAS points of the ring."""
+    def __init__(self, nodes=(), replicas: int = RING_REPLICAS):
+        self.nodes = sorted(set(nodes))
+        points = sorted((ring_hash(f"{node}#{replica}"), node) for node in self.nodes for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def __repr__(self):
+        return f"HashRing Nodes={self.nodes}"
+
+    def owner(self, key) -> str:
+        """The node of the first point clockwise from the key's hash, None on an empty ring."""
+        if not self._hashes:
+            return None
+        position = bisect_right(self._hashes, ring_hash(str(key))) % len(self._hashes)
+        return self._nodes[position]
+
+
+class LeaseStore():
+    """Leases and shard heartbeats in a SQLite file shared by every shard of the host.
+
+    A lease is owned by one shard until it expires. Its token grows by one every time the lease
+    changes hands, so the token orders the owners of a lease.
+    """
+    def __init__(self, path: str = LEASE_PATH, ttl: float = LEASE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 10})
+        event.listen(self.engine, "connect", self._configure)
+        with self.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, token INTEGER NOT NULL, expires_at REAL NOT NULL)"))
+            connection.execute(text("CREATE TABLE IF NOT EXISTS shards (shard_id TEXT PRIMARY KEY, seen_at REAL NOT NULL)"))
+
+    def __repr__(self):
+        return f"LeaseStore Path={self.path}, TTL={self.ttl}s"
+
+    @staticmethod
+    def _configure(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.close()
+
+    def acquire(self, name: str, owner: str) -> int:
+        """Take or renew the lease for `owner`. Returns its token, None while another owner holds it."""
+        now = time.time()
+        with self.engine.begin() as connection:
+            # One statement, so two shards racing for an expired lease cannot both win it
+            connection.execute(text(
+                "INSERT INTO leases (name, owner, token, expires_at) VALUES (:name, :owner, 1, :expires_at) "
+                "ON CONFLICT (name) DO UPDATE SET "
+                "token = CASE WHEN leases.owner = excluded.owner THEN leases.token ELSE leases.token + 1 END, "
+                "owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at < :now"
+            ), {"name": name, "owner": owner, "expires_at": now + self.ttl, "now": now})
+            lease = connection.execute(text("SELECT owner, token FROM leases WHERE name = :name"), {"name": name}).one()
+        return lease.token if lease.owner == owner else None
+
+    def renew(self, name: str, owner: str, token: int) -> bool:
+        """Extend a lease that is still held with this token."""
+        now = time.time()
+        with self.engine.begin() as connection:
+            renewed = connection.execute(text(
+                "UPDATE leases SET expires_at = :expires_at "
+                "WHERE name = :name AND owner = :owner AND token = :token AND expires_at >= :now"
+            ), {"name": name, "owner": owner, "token": token, "expires_at": now + self.ttl, "now": now}).rowcount
+        return bool(renewed)
+
+    def release(self, name: str, owner: str, token: int):
+        """Let the lease expire now, so the next owner does not have to wait out the TTL."""
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "UPDATE leases SET expires_at = 0 WHERE name = :name AND owner = :owner AND token = :token"
+            ), {"name": name, "owner": owner, "token": token})
+
+    def heartbeat(self, shard_id: str):
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO shards (shard_id, seen_at) VALUES (:shard_id, :now) "
+                "ON CONFLICT (shard_id) DO UPDATE SET seen_at = excluded.seen_at"
+            ), {"shard_id": shard_id, "now": time.time()})
+
+    def leave(self, shard_id: str):
+        with self.engine.begin() as connection:
+            connection.execute(text("DELETE FROM shards WHERE shard_id = :shard_id"), {"shard_id": shard_id})
+
+    def live_shards(self) -> list[str]:
+        with self.engine.connect() as connection:
+            return connection.execute(
+                text("SELECT shard_id FROM shards WHERE seen_at >= :since ORDER BY shard_id"), {"since": time.time() - self.ttl}
+            ).scalars().all()
+
+
+class RoundClock():
+    """Wall clock slots of one table, the same on every shard: slot n starts `offset + n * period` seconds after the epoch."""
+    def __init__(self, period: float, offset: float = 0):
+        self.period = period
+        self.offset = offset % period
+
+    def __repr__(self):
+        return f"RoundClock Period={self.period}s, Offset={self.offset:.2f}s"
+
+    def slot_at(self, now: float) -> int:
+        return math.floor((now - self.offset) / self.period)
+
+    def start_of(self, slot: int) -> float:
+        return self.offset + slot * self.period
+
+    async def next_slot(self) -> int:
+        """Wait for the next slot to start and return it. A round that overran its slot skips the slots it missed."""
+        now = time.time()
+        slot = self.slot_at(now) + 1
+        await asyncio.sleep(max(0, self.start_of(slot) - now))
+        return slot
+
+class TableClock(RoundClock):
+    """The round clock of a table: slots long enough for a whole round of it, the tables spread over the slot
+    by their channel id. The period follows the table's current betting period and pause, so a change to them
+    times the slots from the next round on."""
+    def __init__(self, table: RouletteTable):
+        self.table = table
+        self.phase = ring_hash(str(table.channel_id)) % 1000 / 1000
+
+    @property
+    def period(self) -> float:
+        return self.table.betting_duration + game.ANIMATION_DURATION + self.table.pause + ROUND_SLACK
+
+    @property
+    def offset(self) -> float:
+        return self.phase * self.period
+
+
+class ShardCoordinator():
+    """Runs the tables of ROULETTE_TABLES this shard owns and hands the others over to their owners.
+
+    Every RENEW_INTERVAL the shard heartbeats, rebuilds the hash ring from the live shards, takes the
+    leases of the tables the ring gives it and renews the ones it runs. A table it no longer owns, or
+    whose lease it failed to renew, is stopped at once and its lease released.
+    """
+    def __init__(self, manager: TableManager, store: LeaseStore, shard_id: str = None, config: str = None):
+        self.manager = manager
+        self.store = store
+        self.shard_id = shard_id or os.getenv("SHARD_ID") or f"{socket.gethostname()}-{os.getpid()}"
+        config = os.getenv("ROULETTE_TABLES", "") if config is None else config
+        self.tables = {options["channel_id"]: options for options in parse_tables(config)}
+        self.tokens: dict[int, int] = {}  # Lease tokens of the tables this shard runs
+        self.ring = HashRing()
+        self._last_index_refresh = 0
+        self._task: asyncio.Task = None
+
+    def __repr__(self):
+        return f"ShardCoordinator Shard={self.shard_id}, Tables={sorted(self.tokens)}, Shards={self.ring.nodes}"
+
+    def set_betting_duration(self, channel_id: int, betting_duration: int):
+        """Keep a new betting period of a table for when this shard takes the table over again."""
+        if channel_id in self.tables:
+            self.tables[channel_id]["betting_duration"] = betting_duration
+
+    @staticmethod
+    def lease_name(channel_id: int) -> str:
+        return f"table:{channel_id}"
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for channel_id in list(self.tokens):
+            await self.give_up(channel_id)
+        await asyncio.to_thread(self.store.leave, self.shard_id)
+
+    async def _run(self):
+        # Rounds from before tables existed have no table, settling them from every shard is safe as settling is exactly-once
+        for unsettled_round in await database.run(database.get_unsettled_rounds, None):
+            await database.run(database.process_bets, unsettled_round.id)
+        while True:
+            try:
+                await self.rebalance()
+            except Exception as e:
+                print(f"Error rebalancing shard {self.shard_id}: {e}")
+            await asyncio.sleep(RENEW_INTERVAL)
+
+    async def rebalance(self):
+        await asyncio.to_thread(self.store.heartbeat, self.shard_id)
+        self.ring = HashRing(await asyncio.to_thread(self.store.live_shards))
+
+        for channel_id in self.tables:
+            owned = self.ring.owner(channel_id) == self.shard_id
+            token = self.tokens.get(channel_id)
+            if token is None:
+                if owned:
+                    await self.take_over(channel_id)
+            elif not owned or not await asyncio.to_thread(self.store.renew, self.lease_name(channel_id), self.shard_id, token):
+                await self.give_up(channel_id)
+
+        if time.monotonic() - self._last_index_refresh >= INDEX_REFRESH:
+            await database.run(database.load_gambler_index)
+            self._last_index_refresh = time.monotonic()
+
+    async def take_over(self, channel_id: int):
+        """Take the table's lease, fence out its previous owner and start running it."""
+        token = await asyncio.to_thread(self.store.acquire, self.lease_name(channel_id), self.shard_id)
+        if token is None:
+            return  # The previous owner still holds it, it gives the table up on its next rebalance
+        if not await database.run(database.fence_table, channel_id, token):
+            return
+        self.tokens[channel_id] = token
+        options = self.tables[channel_id]
+        table = self.manager.add(**options)
+        table.fence = (channel_id, token)
+        table.clock = TableClock(table)
+        try:
+            await table.setup()
+            table.start()
+            print(f"Shard {self.shard_id} took over table {channel_id} with lease token {token}")
+        except Exception as e:
+            print(f"Error taking over table {channel_id}: {e}")
+            await self.give_up(channel_id)
+
+    async def give_up(self, channel_id: int):
+        token = self.tokens.pop(channel_id, None)
+        table = self.manager.get(channel_id)
+        if table:
+            await self.manager.remove(channel_id)
+            for message in (table.roulette_msg, table.leaderboard_msg):
+                try:
+                    if message:
+                        await message.delete()
+                except HTTPException as e:
+                    print(f"Error deleting a message of table {channel_id}: {e}")
+        if token is not None:
+            await asyncio.to_thread(self.store.release, self.lease_name(channel_id), self.shard_id, token)
+            print(f"Shard {self.shard_id} gave up table {channel_id}")
@@ -0,0 +1,458 @@
+import asyncio
+import os
+import random
+import time
+
+from discord import Embed, Color, Interaction
+from discord.abc import Messageable
+from discord.enums import ButtonStyle
+from discord.ext import commands
+from discord.ui import Button, View
+from discord.message import Message
+
+from emojis import Emoji
+from exceptions import InsufficientBalanceException, NoGamblerException, BettingClosedException, DuplicateBetException
+import embed_messages
+import game
+from betbook import RoundBook, TABLE_ROWS
+from renderer import RenderScheduler
+from database import Gambler, Round
+import database
+import metrics
+
+ROUND_PAUSE = 5  # Seconds between the result of a round and the next one
+RESTART_EVERY = 50  # Rounds after which a table posts fresh messages
+TABLE_STAGGER = 1.5  # Seconds between the starts of two tables, so their timers and edits do not line up
+
+def parse_tables(config: str) -> list[dict]:
+    """Tables of a `channel_id[:betting_duration[:pause]]` comma separated list, e.g. ROULETTE_TABLES."""
+    tables = []
+    for entry in filter(None, (part.strip() for part in config.split(","))):
+        channel_id, *timing = entry.split(":")
+        table = {"channel_id": int(channel_id)}
+        if len(timing) > 0 and timing[0]:
+            table["betting_duration"] = int(timing[0])
+        if len(timing) > 1 and timing[1]:
+            table["pause"] = float(timing[1])
+        tables.append(table)
+    return tables
+
+
+# ---------------------------- BETS TABLE ---------------------------- #
+def update_bets_table(book: RoundBook = None, isRoundEnd: bool = False) -> str:
+    round_result = book.result_color if book is not None else None
+    bets_table = {game.Results.GREEN: [], game.Results.RED: [], game.Results.BLACK: []}
+
+    # Define headers based on round end or not
+    if not isRoundEnd:
+        headers = [
+            "🟥 Red 2x",
+            "🟩 Green 14x",
+            "⬛ Black 2x"
+        ]
+        table_header = (f" {headers[0].center(16)} {headers[1].center(16)} {headers[2].center(16)}")
+    else:
+        headers = (
+            ["🟥 Red 2x 💲", "🟩 Green 14x ❌", "⬛ Black 2x ❌"] if round_result == game.Results.RED else
+            ["🟥 Red 2x ❌", "🟩 Green 14x 💲", "⬛ Black 2x ❌"] if round_result == game.Results.GREEN else
+            ["🟥 Red 2x ❌", "🟩 Green 14x ❌", "⬛ Black 2x 💲"] if round_result == game.Results.BLACK else None
+        )
+        table_header = (f"{headers[0].center(15)} {headers[1].center(15)}{headers[2].center(15)}")
+
+    # Fill bets_table from the round book, only the rows that fit on the table are rendered
+    for bet_on in bets_table:
+        entries = book.table_rows(bet_on) if book is not None else []
+        for entry in entries:
+            if isRoundEnd:
+                reward = game.payout(entry.amount, bet_on, True)
+                name = f"{entry.name}".ljust(8)
+                bet_val = f"+{reward}".center(6) if round_result==bet_on else f"-{entry.amount}".center(6)
+            else:
+                name = f"{entry.name}".ljust(9)
+                bet_val = f"{entry.amount}".center(5)
+
+            bets_table[bet_on].append(f"{name[:8]} {bet_val}")
+
+    # Generate the table header
+    table_divider = f"+{'-' * 17}+{'-' * 17}+{'-' * 17}+"
+
+    # Generate table rows
+    table_rows = []
+    max_rows = max(5,
+        len(bets_table[game.Results.GREEN]),
+        len(bets_table[game.Results.RED]),
+        len(bets_table[game.Results.BLACK])
+    )
+    min_rows = min(max_rows, TABLE_ROWS)  # Limit rows for display
+
+    for i in range(min_rows):
+        green = bets_table[game.Results.GREEN][i] if i < len(bets_table[game.Results.GREEN]) else ""
+        red = bets_table[game.Results.RED][i] if i < len(bets_table[game.Results.RED]) else ""
+        black = bets_table[game.Results.BLACK][i] if i < len(bets_table[game.Results.BLACK]) else ""
+        table_rows.append(
+            f"| {red.center(15)} | {green.center(15)} | {black.center(15)} |"
+        )
+
+    # Combine all parts into the final table
+    table = f"{table_divider}\n{table_header}\n{table_divider}\n" + "\n".join(table_rows) + f"\n{table_divider}"
+    content = f"```diff\n{table}\n```"
+    return content
+
+def timer_message(remaining: int, betting_duration: int) -> str:
+    progress = int(((betting_duration - remaining) / betting_duration) * game.PROGRESS_BAR_LENGTH) if betting_duration else game.PROGRESS_BAR_LENGTH
+    progress_bar = Emoji.PROGRESS_BAR.BEHIND_EDGE*progress + Emoji.PROGRESS_BAR.EDGE + Emoji.PROGRESS_BAR.FRONT_EDGE*(game.PROGRESS_BAR_LENGTH - progress)
+    return f"Place your bets! ⏳ **{remaining}s** remaining\n{Emoji.PROGRESS_BAR.START}{progress_bar}{Emoji.PROGRESS_BAR.BEFORE_END}"
+
+CLOSED_TIMER_MSG = f"Betting is now closed! 🚫\n{Emoji.PROGRESS_BAR.START}{Emoji.PROGRESS_BAR.BEHIND_EDGE * game.PROGRESS_BAR_LENGTH}{Emoji.PROGRESS_BAR.AFTER_END}"
+VOID_ROUND_MSG = "This round is void, the bets could not be saved and no stakes were taken. ⚠️"
+
+
+# ---------------------------- TABLE ---------------------------- #
+class RouletteTable():
+    """One roulette table: its messages in a channel, the book of its open round, its render scheduler and its loop.
+
+    Tables only share the database layer, so any number of them run side by side in one process.
+    Rounds are tagged with the table's channel id, so every table spins from its own last result.
+    """
+    def __init__(self, bot: commands.Bot, channel_id: int, betting_duration: int = None, pause: float = ROUND_PAUSE):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.betting_duration = game.BETTING_DURATION if betting_duration is None else betting_duration
+        self.pause = pause
+        self.rounds_played = 0
+
+        self.roulette_msg: Message = None
+        self.roulette_embed: Embed = None
+        self.leaderboard_msg: Message = None
+        self.buttons: View = None
+        self.book: RoundBook = None
+        self.renderer: RenderScheduler = None
+        self._task: asyncio.Task = None
+
+        # Set by a shard that holds the table's lease: the (table id, token) pair fencing its writes and the shared round clock
+        self.fence: tuple[int, int] = None
+        self.clock = None
+
+    def __repr__(self):
+        return f"RouletteTable Channel={self.channel_id}, Betting={self.betting_duration}s, Rounds={self.rounds_played}, Running={self.running}"
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # ----------------- MESSAGES
+    async def setup(self, channel: Messageable = None):
+        """Post the leaderboard and the roulette messages, in `channel` or the table's channel."""
+        channel = channel or await self.bot.fetch_channel(self.channel_id)
+        leaderboard = await database.run(embed_messages.leaderboard)
+        self.roulette_embed = embed_messages.setup_roulette()
+        self.buttons = GameView(self)
+        self.roulette_embed.add_field(name="Time", value=timer_message(self.betting_duration, self.betting_duration), inline=False)
+        self.roulette_embed.add_field(name="Bets", value=update_bets_table(), inline=False)
+
+        self.leaderboard_msg = await channel.send(embed=leaderboard)
+        self.roulette_msg = await channel.send(embed=self.roulette_embed, view=self.buttons)
+
+        # The scheduler owns the roulette message from now on, every edit goes through it
+        if self.renderer:
+            await self.renderer.close()
+        self.renderer = RenderScheduler(self.roulette_msg, self.roulette_embed, self.buttons)
+        self.renderer.start()
+        self.set_button_states(False)
+
+    async def restart(self):
+        await self.renderer.close()
+        await self.roulette_msg.delete(delay=1)
+        await self.leaderboard_msg.delete(delay=1)
+        await self.setup()
+
+    async def update_leaderboard(self):
+        if self.leaderboard_msg:
+            leaderboard = await database.run(embed_messages.leaderboard)
+            started = time.perf_counter()
+            await self.leaderboard_msg.edit(embed=leaderboard)
+            if metrics.ENABLED:
+                metrics.DISCORD_EDITS.observe(time.perf_counter() - started, "leaderboard")
+
+    def set_button_states(self, state: bool = True):
+        if self.buttons:
+            for item in self.buttons.children:
+                if isinstance(item, BetButton):
+                    item.disabled = not(state)
+            self.renderer.set_view(self.buttons)  # Update the message with the disabled buttons
+
+    # ----------------- LOOP
+    def start(self, delay: float = 0):
+        if not self.running:
+            self._task = asyncio.create_task(self.run(delay))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.renderer:
+            await self.renderer.close()
+
+    async def run(self, delay: float = 0):
+        # ----------------- SETTLE THE ROUNDS OF THIS TABLE LEFT OVER FROM A CRASH OR FROM ITS PREVIOUS SHARD
+        for unsettled_round in await database.run(database.get_unsettled_rounds, self.channel_id):
+            await database.run(database.process_bets, unsettled_round.id, self.fence)
+        await asyncio.sleep(delay)
+
+        while True:
+            # With a shared round clock rounds start on its slots, otherwise a pause after each round
+            slot = await self.clock.next_slot() if self.clock else None
+            try:
+                await self.play_round(slot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in the round of table {self.channel_id}: {e}")
+                # Pay out whatever of the round reached the database, settling twice is a no-op
+                if self.book is not None:
+                    await database.run(database.process_bets, self.book.round_id, self.fence)
+            if not self.clock:
+                await asyncio.sleep(self.pause)
+
+    async def play_round(self, slot: int = None):
+        laps = metrics.laps(metrics.ROUND_PHASES)
+        # ----------------- NEED TO RESTART ?
+        if self.rounds_played and self.rounds_played % RESTART_EVERY == 0:
+            await self.restart()
+        # ----------------- UPDATE THE LEADERBOARD
+        await self.update_leaderboard()
+
+        # ----------------- CREATE A NEW ROUND
+        last_round: Round = await database.run(database.get_last_round, self.channel_id)
+        round_id = game.getNewRoundID(self.channel_id, slot)
+        current_round: Round = await database.run(database.create_round, round_id, game.getNewRoundResult(), self.channel_id, self.fence)
+        if current_round is None:
+            return  # The round of this slot exists already or the table moved to another shard
+        self.book = RoundBook(current_round.id, current_round.result_color)
+        self.rounds_played += 1
+        laps.lap("prepare")
+
+        # ----------------- EMBED COLOUR TO DEFAULT AND CLEAR THE BETS TABLE
+        self.renderer.set_color(Color.gold())
+        self.renderer.set_field(index=4, name="Bets", value=update_bets_table(), inline=False)
+
+        # ----------------- ENABLE BET BUTTONS AND START THE TIMER FOR BETTING
+        self.set_button_states(True)
+        betting_duration = self.betting_duration
+        self.renderer.set_field(index=3, name="Time", value=timer_message(betting_duration, betting_duration), inline=False)
+        for elapsed in range(1, betting_duration+1):
+            await asyncio.sleep(1)
+            self.renderer.set_field(index=3, name="Time", value=timer_message(betting_duration - elapsed, betting_duration), inline=False)
+        laps.lap("betting")
+
+        # ----------------- BETS OVER! DISABLE BET BUTTONS AND FLUSH THE BOOK
+        self.book.seal()
+        self.set_button_states(False)
+        self.renderer.set_field(index=3, name="Time", value=CLOSED_TIMER_MSG, inline=False)
+        try:
+            refused = await database.run(database.create_bets, self.book, self.fence)
+        except Exception:
+            # No bet reached the database, the round is settled empty by the error handling of `run`
+            self.renderer.set_field(index=3, name="Time", value=VOID_ROUND_MSG, inline=False)
+            self.renderer.set_field(index=4, name="Bets", value=update_bets_table(), inline=False)
+            raise
+        for entry in refused:
+            # The balance went to bets at other tables before this book was flushed
+            self.book.drop(entry.gambler_id)
+            print(f"Bet of {entry.name} on round {self.book.round_id} refused, their balance no longer covers ${entry.amount}")
+        if refused:
+            self.renderer.set_field(index=4, name="Bets", value=update_bets_table(self.book), inline=False)
+        laps.lap("flush")
+
+        # ----------------- BETS OVER! ANIMATE THE ROULETTE
+        await self.animate_roulette(last_round.result_num if last_round else 0, current_round.result_num)
+        laps.lap("animation")
+
+        # ----------------- PREVIOUS ROLLS AND EMBED COLOR
+        last_rounds: list[Round] = await database.run(database.get_last_x_rounds, 8, self.channel_id)
+        last_rolls = [Emoji.roulette_values.get(round.result_num) for round in last_rounds]
+        self.renderer.set_field(index=0, name="Previous Rolls", value=" ".join(last_rolls), inline=False)
+        color = (Color.red() if current_round.result_color == game.Results.RED else
+            Color.green() if current_round.result_color == game.Results.GREEN else
+            Color.darker_grey() if current_round.result_color == game.Results.BLACK else Color.gold())
+        self.renderer.set_color(color)
+
+        # ----------------- SHOW THE RESULTS ON THE BET TABLE
+        self.renderer.set_field(index=4, name="Bets", value=update_bets_table(self.book, isRoundEnd=True), inline=False)
+
+        # ----------------- PROCESS RESULTS TO DATABASE
+        await database.run(database.process_bets, current_round.id, self.fence)
+        laps.lap("settle")
+        if metrics.ENABLED:
+            metrics.ROUNDS.inc(self.channel_id)
+
+    async def animate_roulette(self, last_round_result: int, current_round_result: int):
+        plan = game.SPIN_PLANS[(last_round_result, current_round_result, random.choice(game.EXTRA_ROTATIONS))]
+
+        # Animation
+        for window in plan:
+            if window is not None:
+                self.renderer.set_field(index=1, name="Roulette", value=window, inline=False)
+            await asyncio.sleep(game.SLEEP_DURATION)
+
+        # The wheel has to show where it stopped before the results are revealed
+        await self.renderer.flush()
+
+
+class TableManager():
+    """Runs any number of roulette tables as concurrent tasks of one bot, keyed by channel id."""
+    def __init__(self, bot: commands.Bot, stagger: float = TABLE_STAGGER):
+        self.bot = bot
+        self.stagger = stagger
+        self.tables: dict[int, RouletteTable] = {}
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __repr__(self):
+        return f"TableManager Tables={len(self.tables)}, Running={sum(table.running for table in self.tables.values())}"
+
+    def get(self, channel_id: int) -> RouletteTable:
+        return self.tables.get(channel_id)
+
+    def add(self, channel_id: int, betting_duration: int = None, pause: float = ROUND_PAUSE) -> RouletteTable:
+        table = self.tables.get(channel_id)
+        if table is None:
+            table = self.tables[channel_id] = RouletteTable(self.bot, channel_id, betting_duration, pause)
+        return table
+
+    async def remove(self, channel_id: int):
+        table = self.tables.pop(channel_id, None)
+        if table:
+            await table.stop()
+
+    def start(self, channel_id: int):
+        """Start a table, a little after the tables already running so their rounds interleave."""
+        running = sum(table.running for table in self.tables.values())
+        self.tables[channel_id].start(delay=running * self.stagger)
+
+    async def open_configured(self, config: str = None):
+        """Set up and start every table of ROULETTE_TABLES."""
+        config = os.getenv("ROULETTE_TABLES", "") if config is None else config
+        # Rounds from before tables existed have no table, settle them once before any table runs
+        for unsettled_round in await database.run(database.get_unsettled_rounds, None):
+            await database.run(database.process_bets, unsettled_round.id)
+        for options in parse_tables(config):
+            table = self.add(**options)
+            if table.running:
+                continue
+            try:
+                await table.setup()
+                self.start(table.channel_id)
+            except Exception as e:
+                print(f"Error opening the table of channel {table.channel_id}: {e}")
+
+    async def close(self):
+        for table in self.tables.values():
+            await table.stop()
+
+
+# ---------------------------- BUTTON CLASSES ---------------------------- #
+class GameView(View):
+    def __init__(self, table: RouletteTable):
+        super().__init__(timeout=None)
+        self.table = table
+        self.add_item(BetButton(label="RED", bet_on=game.Results.RED, style=ButtonStyle.red))
+        self.add_item(BetButton(label="GREEN", bet_on=game.Results.GREEN, style=ButtonStyle.green))
+        self.add_item(BetButton(label="BLACK", bet_on=game.Results.BLACK, style=ButtonStyle.grey))
+        self.add_item(MyStatsButton())
+        self.add_item(RegisterButton())
+        self.add_item(DailyRewardButton())
+
+
+class BetButton(Button):
+    def __init__(self, label, bet_on, style, emoji=None):
+        if emoji:
+            super().__init__(label=label, style=style, emoji=emoji)
+        else:
+            super().__init__(label=label, style=style)
+        self.bet_on = bet_on
+
+    async def callback(self, interaction: Interaction):
+        table: RouletteTable = self.view.table
+
+        # The book of the round that is taking bets at this table
+        book = table.book
+        if book is None:
+            await interaction.response.send_message("No active round found.", ephemeral=True)
+            return
+
+        # Fetch or create the gambler
+        try:
+            gambler:Gambler = await database.run(database.get_gambler_by_id, interaction.user.id)
+        except NoGamblerException:
+            await interaction.response.send_message("You are not registered as a gambler yet! Click on the `🆕 Register` button to start playing.", ephemeral=True)
+            return
+
+        # Place the bet, stakes are taken from the balances when the book is flushed
+        bet_amount = gambler.default_bet_amount
+        try:
+            if bet_amount > gambler.balance:
+                raise InsufficientBalanceException(f"You do not have enough credits.\nBalance: **${gambler.balance}**\nBet: **${bet_amount}**")
+            book.place(gambler.id, gambler.name, bet_amount, self.bet_on, gambler.balance)
+
+            table.renderer.set_field(index=4, name="Bets", value=update_bets_table(book, isRoundEnd=False), inline=False)
+            await interaction.response.send_message(f"Bet placed on **{self.bet_on}** for **${bet_amount}**!\nYour updated balance: **${gambler.balance - bet_amount}**", ephemeral=True, delete_after=2)
+        except (DuplicateBetException, BettingClosedException) as e:
+            await interaction.response.send_message(f"{e}", ephemeral=True, delete_after=2)
+        except InsufficientBalanceException as e:
+            await interaction.response.send_message(f"{e}", ephemeral=True)
+        except Exception as e:
+            print(f"Error processing bet: {e}")
+            await interaction.response.send_message("There was an error placing your bet.", ephemeral=True, delete_after=2)
+
+class MyStatsButton(Button):
+    def __init__(self):
+        super().__init__(label="My Stats", style=ButtonStyle.primary, emoji="🧮")
+
+    async def callback(self, interaction: Interaction):
+        try:
+            gambler = await database.run(database.get_gambler_by_id, interaction.user.id)
+        except NoGamblerException:
+            await interaction.response.send_message("You are not registered as a gambler yet! Click on the `🆕 Register` button to start playing.", ephemeral=True)
+            return
+
+        stats_embed = embed_messages.gambler_statistics(interaction, gambler)
+        await interaction.response.send_message(embed=stats_embed, ephemeral=True)
+
+class RegisterButton(Button):
+    def __init__(self):
+        super().__init__(label="Register", style=ButtonStyle.primary, emoji="🆕")
+
+    async def callback(self, interaction: Interaction):
+        try:
+            gambler = await database.run(database.get_gambler_by_id, interaction.user.id)
+            await interaction.response.send_message(f"You are already registered as **{gambler.name}** with **${gambler.balance:.2f}** credit.", ephemeral=True)
+        except NoGamblerException:
+            created_gambler: Gambler = await database.run(database.create_gambler, interaction.user.id, interaction.user.global_name)
+            if not created_gambler:
+                await interaction.response.send_message("Error during registration. Please try again later.", ephemeral=True)
+                return
+            # ----------------- UPDATE THE LEADERBOARD
+            await self.view.table.update_leaderboard()
+            await interaction.response.send_message(f"You have been registered as **{interaction.user.global_name}** with **${created_gambler.balance:.2f}** credit.", ephemeral=True)
+
+class DailyRewardButton(Button):
+    def __init__(self):
+        super().__init__(label="Claim Daily Reward", style=ButtonStyle.primary, emoji="🎁")
+
+    async def callback(self, interaction: Interaction):
+        try:
+            gambler, claimed = await database.run(database.claim_daily_reward, interaction.user.id)
+        except NoGamblerException:
+            await interaction.response.send_message("You are not registered as a gambler yet! Click on the `🆕 Register` button to start playing.", ephemeral=True)
+            return
+
+        if claimed:
+            await interaction.response.send_message(embed=embed_messages.daily_claimed_success(interaction, gambler), ephemeral=True, delete_after=3)
+        else:
+            await interaction.response.send_message(embed=embed_messages.daily_claimed_fail(interaction, gambler), ephemeral=True, delete_after=3)
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules read their settings at import: a scratch database, a fixed exchange rate, files next to them
+os.environ.setdefault("DATABASE_DIR", tempfile.mkdtemp(prefix="roulette-tests-"))
+os.environ.setdefault("YUANUSD", "0.14,01/01/2100")
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
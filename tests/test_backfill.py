@@ -0,0 +1,54 @@
+import time
+
+import pytest
+from sqlalchemy import delete, insert
+
+import database
+
+GAMBLERS = 50
+ROUNDS = 2000  # 100k bets, a few months of a busy table
+FIRST_ID = 500000
+
+@pytest.fixture
+def history():
+    gambler_ids = range(FIRST_ID, FIRST_ID + GAMBLERS)
+    round_ids = [f"backfill-{round_num}" for round_num in range(ROUNDS)]
+
+    def seed():
+        database.session.execute(insert(database.Gambler), [
+            {"id": gambler_id, "name": f"backfill{gambler_id}", "balance": 0, "total_wagered": 0, "xp": 0, "level": 1,
+             "daily": 0, "default_bet_amount": 1}
+            for gambler_id in gambler_ids
+        ])
+        database.session.execute(insert(database.Round), [
+            {"id": round_id, "result_num": 1, "result_color": "RED", "settled": True} for round_id in round_ids
+        ])
+        database.session.execute(insert(database.Bet), [
+            {"id": f"{round_id}-{gambler_id}", "amount": 1, "bet_on": "RED" if gambler_id % 2 else "BLACK",
+             "is_correct": bool(gambler_id % 2), "old_balance": 10, "new_balance": 11, "gambler_id": gambler_id, "round_id": round_id}
+            for round_id in round_ids for gambler_id in gambler_ids
+        ])
+        database.session.commit()
+    database.unit_of_work(seed)
+    yield gambler_ids
+
+    def clean():
+        database.session.execute(delete(database.Bet).where(database.Bet.gambler_id.in_(gambler_ids)))
+        database.session.execute(delete(database.GamblerStats).where(database.GamblerStats.gambler_id.in_(gambler_ids)))
+        database.session.execute(delete(database.Round).where(database.Round.id.in_(round_ids)))
+        database.session.execute(delete(database.Gambler).where(database.Gambler.id.in_(gambler_ids)))
+        database.session.commit()
+    database.unit_of_work(clean)
+
+def test_backfill_is_linear_in_the_bets(history):
+    started = time.perf_counter()
+    database.unit_of_work(database.backfill_gambler_stats)
+    elapsed = time.perf_counter() - started
+    # Searching rounds once per bet took minutes at this size, one pass takes a few seconds
+    assert elapsed < 20, f"backfill of {GAMBLERS * ROUNDS} bets took {elapsed:.1f}s"
+
+    stats = database.unit_of_work(lambda: {row.gambler_id: row for row in database.session.query(database.GamblerStats).filter(
+        database.GamblerStats.gambler_id.in_(history))})
+    winner, loser = stats[FIRST_ID + 1], stats[FIRST_ID]
+    assert (winner.red_bets, winner.red_wins, winner.current_streak, winner.longest_win_streak) == (ROUNDS, ROUNDS, ROUNDS, ROUNDS)
+    assert (loser.black_bets, loser.black_wins, loser.current_streak, loser.longest_loss_streak) == (ROUNDS, 0, -ROUNDS, ROUNDS)
@@ -0,0 +1,28 @@
+import asyncio
+import threading
+
+from catalog import Catalog
+
+class RecordingCatalog(Catalog):
+    """Remembers the thread each build ran on."""
+    def __init__(self, index):
+        super().__init__(index)
+        self.build_threads = []
+
+    def build(self):
+        self.build_threads.append(threading.current_thread())
+        super().build()
+
+def test_ensure_built_builds_off_the_event_loop_once():
+    catalog = RecordingCatalog({"AK-47 | Redline (Field-Tested)": 1, "AWP | Asiimov (Field-Tested)": 2})
+    assert not catalog.built
+
+    async def scenario():
+        await catalog.ensure_built()
+        await catalog.ensure_built()
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(scenario())
+    assert catalog.built
+    assert len(catalog.build_threads) == 1 and catalog.build_threads[0] is not loop_thread
+    assert catalog.search("redline", 1)[0].goods_id == 1
@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+import pytest
+
+import database
+import game
+from betbook import RoundBook
+
+def open_book(round_id: str, table_id: int) -> RoundBook:
+    database.unit_of_work(database.create_round, round_id, 1, table_id)
+    settled_round = database.unit_of_work(database.get_round_by_id, round_id)
+    return RoundBook(settled_round.id, settled_round.result_color)
+
+def balance_of(gambler_id: int) -> Decimal:
+    return database.unit_of_work(lambda: database.get_gambler_by_id(gambler_id).balance)
+
+def bets_of(gambler_id: int) -> list[str]:
+    return database.unit_of_work(lambda: [bet.round_id for bet in database.session.query(database.Bet).filter_by(gambler_id=gambler_id)])
+
+def test_same_balance_is_not_staked_at_two_tables():
+    database.unit_of_work(database.create_gambler, 2101, "two tables", balance=1)
+    first, second = open_book("two-tables-1", 1), open_book("two-tables-2", 2)
+    # Both clicks saw a balance of 1.00
+    for book in (first, second):
+        book.place(2101, "two tables", Decimal("1.00"), game.Results.RED, Decimal("1.00"))
+        book.seal()
+
+    assert database.unit_of_work(database.create_bets, first) == []
+    refused = database.unit_of_work(database.create_bets, second)
+    assert [entry.gambler_id for entry in refused] == [2101]
+    assert balance_of(2101) == Decimal("0.00")
+    assert bets_of(2101) == ["two-tables-1"]
+
+    second.drop(2101)
+    assert len(second) == 0 and second.totals[game.Results.RED] == 0 and not second.by_color[game.Results.RED]
+
+def test_refused_bet_does_not_hold_back_the_others():
+    database.unit_of_work(database.create_gambler, 2102, "broke", balance=0.5)
+    database.unit_of_work(database.create_gambler, 2103, "covered", balance=5)
+    book = open_book("partly-covered", 1)
+    book.place(2102, "broke", Decimal("1.00"), game.Results.BLACK, Decimal("1.00"))
+    book.place(2103, "covered", Decimal("2.00"), game.Results.BLACK, Decimal("5.00"))
+    book.seal()
+
+    refused = database.unit_of_work(database.create_bets, book)
+    assert [entry.gambler_id for entry in refused] == [2102]
+    assert (balance_of(2102), balance_of(2103)) == (Decimal("0.50"), Decimal("3.00"))
+    assert bets_of(2102) == [] and bets_of(2103) == ["partly-covered"]
+
+def test_balance_changed_after_it_was_read_fails_the_flush(monkeypatch):
+    database.unit_of_work(database.create_gambler, 2104, "raced", balance=1)
+    book = open_book("raced", 1)
+    book.place(2104, "raced", Decimal("1.00"), game.Results.RED, Decimal("1.00"))
+    book.seal()
+
+    # Another writer takes the balance between the read and the guarded UPDATE
+    execute = database.session.execute
+    def racing_execute(statement, *args, **kwargs):
+        if getattr(statement, "is_update", False):
+            execute(database.update(database.Gambler).where(database.Gambler.id == 2104).values(balance=0))
+        return execute(statement, *args, **kwargs)
+    monkeypatch.setattr(database.session, "execute", racing_execute)
+
+    with pytest.raises(ValueError):
+        database.unit_of_work(database.create_bets, book)
+    monkeypatch.undo()
+    assert balance_of(2104) == Decimal("1.00")
+    assert bets_of(2104) == []
@@ -0,0 +1,23 @@
+from gambler_index import GamblerIndex
+
+def index() -> GamblerIndex:
+    gambler_index = GamblerIndex()
+    gambler_index.load([(101, "Alice"), (202, "bob"), (303, "Carol"), (4104, "al"), (5, "Zed")])
+    return gambler_index
+
+def test_short_query_matches_inside_names():
+    assert index().search("ob") == [(202, "bob")]
+    assert index().search("o") == [(202, "bob"), (303, "Carol")]
+    assert index().search("L") == [(4104, "al"), (101, "Alice"), (303, "Carol")]
+
+def test_short_query_matches_inside_ids():
+    assert index().search("04") == [(4104, "al")]
+    assert index().search("0") == [(4104, "al"), (101, "Alice"), (202, "bob"), (303, "Carol")]
+
+def test_short_query_respects_the_limit():
+    assert len(index().search("a", 2)) == 2
+
+def test_longer_queries_use_prefixes_and_trigrams():
+    assert index().search("ali") == [(101, "Alice")]
+    assert index().search("rol") == [(303, "Carol")]
+    assert index().search("410") == [(4104, "al")]
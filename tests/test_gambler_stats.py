@@ -0,0 +1,28 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+import database
+import game
+
+GAMBLER_ID = 2401
+
+def settle(bet_on: str, amount: str, is_correct: bool):
+    bet = SimpleNamespace(gambler_id=GAMBLER_ID, amount=Decimal(amount), bet_on=bet_on, is_correct=is_correct)
+    def upsert():
+        database.upsert_gambler_stats(database.round_stats([bet]).values())
+        database.session.commit()
+    database.unit_of_work(upsert)
+
+def test_upsert_adds_rounds_and_tracks_streaks():
+    database.unit_of_work(database.create_gambler, GAMBLER_ID, "stats")
+    settle(game.Results.RED, "0.10", True)
+    settle(game.Results.RED, "0.50", True)
+    settle(game.Results.GREEN, "1.00", False)
+    settle(game.Results.BLACK, "0.30", False)
+
+    stats = database.unit_of_work(lambda: database.session.get(database.GamblerStats, GAMBLER_ID))
+    assert (stats.red_bets, stats.red_wins, stats.red_wagered) == (2, 2, Decimal("0.60"))
+    assert (stats.green_bets, stats.green_wins, stats.green_wagered) == (1, 0, Decimal("1.00"))
+    assert (stats.black_bets, stats.black_wins, stats.black_wagered) == (1, 0, Decimal("0.30"))
+    assert stats.net_profit == Decimal("0.10") + Decimal("0.50") - Decimal("1.00") - Decimal("0.30")
+    assert (stats.current_streak, stats.longest_win_streak, stats.longest_loss_streak) == (-2, 2, 2)
@@ -0,0 +1,23 @@
+from decimal import Decimal
+
+import database
+from money import to_money
+
+GAMBLER_ID = 1201
+
+def item(asset_id: str, buff_price) -> dict:
+    return {"asset_id": asset_id, "name": "Sticker | Non-Veg", "exterior": None, "is_tradable": True, "tradable_date": None,
+            "inspect_link": None, "image_url": "", "buff_price": buff_price}
+
+def test_missing_price_keeps_the_stored_one():
+    database.unit_of_work(database.create_gambler, GAMBLER_ID, "items")
+    assert database.unit_of_work(database.save_user_items, GAMBLER_ID, [item("a1", to_money(2.5))]) == (1, 0)
+    assert database.unit_of_work(database.save_user_items, GAMBLER_ID, [item("a1", None)]) == (0, 0)
+    stored = database.unit_of_work(lambda: database.session.get(database.Item, "a1").buff_price)
+    assert stored == Decimal("2.50")
+
+def test_new_price_replaces_the_stored_one():
+    database.unit_of_work(database.create_gambler, GAMBLER_ID + 1, "items")
+    database.unit_of_work(database.save_user_items, GAMBLER_ID + 1, [item("b1", to_money(2.5))])
+    assert database.unit_of_work(database.save_user_items, GAMBLER_ID + 1, [item("b1", to_money(3))]) == (0, 1)
+    assert database.unit_of_work(lambda: database.session.get(database.Item, "b1").buff_price) == Decimal("3.00")
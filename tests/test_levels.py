@@ -0,0 +1,34 @@
+import pytest
+
+from levels import LEVEL_DAILY, LEVEL_XP, MAX_LEVEL, MIN_LEVEL, daily_for_level, level_for_xp
+
+@pytest.mark.parametrize("level", range(MIN_LEVEL + 1, MAX_LEVEL + 1))
+def test_level_boundaries(level):
+    start = LEVEL_XP[level]
+    assert level_for_xp(start - 1) == level - 1
+    assert level_for_xp(start) == level
+    assert level_for_xp(start + 1) == level
+
+def test_first_level_starts_at_zero_xp():
+    assert level_for_xp(0) == MIN_LEVEL
+    assert level_for_xp(1) == MIN_LEVEL
+
+def test_negative_xp_stays_at_the_first_level():
+    assert level_for_xp(-1) == MIN_LEVEL
+    assert level_for_xp(-10**9) == MIN_LEVEL
+
+def test_capped_at_max_level():
+    assert level_for_xp(LEVEL_XP[MAX_LEVEL]) == MAX_LEVEL
+    assert level_for_xp(LEVEL_XP[MAX_LEVEL] * 10) == MAX_LEVEL
+    assert level_for_xp(0, MAX_LEVEL + 5) == MAX_LEVEL
+
+def test_never_below_the_current_level():
+    assert level_for_xp(0, 10) == 10
+    assert level_for_xp(LEVEL_XP[12], 10) == 12
+
+def test_daily_for_level_ends():
+    assert daily_for_level(MIN_LEVEL) == LEVEL_DAILY[MIN_LEVEL]
+    assert daily_for_level(MAX_LEVEL) == LEVEL_DAILY[MAX_LEVEL]
+    assert daily_for_level(0) == LEVEL_DAILY[0]
+    assert daily_for_level(-1) == LEVEL_DAILY[0]
+    assert daily_for_level(MAX_LEVEL + 1) == LEVEL_DAILY[MAX_LEVEL]
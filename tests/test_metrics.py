@@ -0,0 +1,37 @@
+import logging
+
+import metrics
+
+ROUTE_FMT = "We are being rate limited. %s %s responded with 429. Retrying in %.2f seconds."
+GLOBAL_FMT = "Global rate limit has been hit. Retrying in %.2f seconds."
+
+def log(handler: metrics.RateLimitLogHandler, msg: str, *args):
+    handler.handle(logging.LogRecord("discord.http", logging.WARNING, __file__, 0, msg, args, None))
+
+def counts() -> dict:
+    return {scope: (metrics.DISCORD_RATE_LIMITS.values.get((scope,), 0), metrics.DISCORD_RETRY_AFTER.values.get((scope,), 0))
+            for scope in ("route", "global")}
+
+def test_route_429_is_counted_once():
+    handler = metrics.RateLimitLogHandler()
+    before = counts()
+    log(handler, ROUTE_FMT, "PATCH", "/channels/1/messages/2", 1.5)
+    after = counts()
+    assert after["route"] == (before["route"][0] + 1, before["route"][1] + 1.5)
+    assert after["global"] == before["global"]
+
+def test_global_429_is_counted_once_as_global():
+    handler = metrics.RateLimitLogHandler()
+    before = counts()
+    log(handler, ROUTE_FMT, "PATCH", "/channels/1/messages/2", 2.0)
+    log(handler, GLOBAL_FMT, 2.0)
+    after = counts()
+    assert after["route"] == before["route"]
+    assert after["global"] == (before["global"][0] + 1, before["global"][1] + 2.0)
+    assert metrics.DISCORD_RATE_LIMITS.total() - sum(count for count, _ in before.values()) == 1
+
+def test_other_records_are_ignored():
+    handler = metrics.RateLimitLogHandler()
+    before = counts()
+    log(handler, "Done sleeping for the rate limit. Retrying...")
+    assert counts() == before
@@ -0,0 +1,120 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import buff
+import database
+from price_cache import PriceCache
+
+PRICED = "Sticker | Mahjong Zhong"
+UNPRICED = "Sticker | Non-Veg"
+
+class FakeClient():
+    def __init__(self, prices: dict):
+        self.prices = prices
+        self.requested = []
+
+    async def get_prices(self, goods_ids) -> dict:
+        goods_ids = list(goods_ids)
+        self.requested.append(goods_ids)
+        return {goods_id: self.prices.get(goods_id, (None, None)) for goods_id in goods_ids}
+
+@pytest.fixture(autouse=True)
+def empty_price_table():
+    def empty():
+        database.session.query(database.ItemPrice).delete()
+        database.session.commit()
+    database.unit_of_work(empty)
+
+def test_miss_is_cached_until_miss_ttl():
+    client = FakeClient({33685: (1.5, 1.2)})
+    cache = PriceCache(client, miss_ttl=timedelta(hours=1))
+
+    async def scenario():
+        first = await cache.get_prices([PRICED, UNPRICED])
+        second = await cache.get_prices([PRICED, UNPRICED])
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == {PRICED: (1.5, 1.2)}
+    assert len(client.requested) == 1  # The miss was not asked for again
+
+def test_miss_is_fetched_again_once_expired():
+    client = FakeClient({})
+    cache = PriceCache(client, miss_ttl=timedelta(0))
+
+    async def scenario():
+        await cache.get_prices([UNPRICED])
+        client.prices[33687] = (0.3, 0.2)
+        return await cache.get_prices([UNPRICED])
+
+    assert asyncio.run(scenario()) == {UNPRICED: (0.3, 0.2)}
+    assert len(client.requested) == 2
+    stored = database.unit_of_work(database.get_item_prices, [UNPRICED])[UNPRICED]
+    assert (stored.lowest_sell, stored.highest_buy) == (0.3, 0.2)
+
+class StandInBuff():
+    """A local Buff answering every order book with `orders`, or with `status` when it is not 200."""
+    def __init__(self):
+        self.status = 200
+        self.orders = [{"price": "10"}]
+        app = web.Application()
+        app.router.add_get(buff.LS_PATH, self.serve)
+        app.router.add_get(buff.HB_PATH, self.serve)
+        self.server = TestServer(app)
+
+    async def serve(self, request):
+        if self.status != 200:
+            return web.Response(status=self.status)
+        return web.json_response({"data": {"items": self.orders}})
+
+    async def client(self) -> buff.BuffPriceClient:
+        await self.server.start_server()
+        client = buff.BuffPriceClient(str(self.server.make_url("")), retries=2, headers={}, params={})
+        client._backoff = lambda attempt: 0
+        return client
+
+def stored_price(name: str) -> tuple:
+    stored = database.unit_of_work(database.get_item_prices, [name]).get(name)
+    return (stored.lowest_sell, stored.highest_buy) if stored else None
+
+def test_buff_outage_keeps_the_stored_price():
+    stand_in = StandInBuff()
+    price = round(10 * buff.YUANUSD, 2)
+
+    async def scenario():
+        client = await stand_in.client()
+        cache = PriceCache(client, ttl=timedelta(0), stale_ttl=timedelta(0))
+        try:
+            first = await cache.get_prices([PRICED])
+            stand_in.status = 503
+            during_outage = await cache.get_prices([PRICED])
+            assert stored_price(PRICED) == (price, price)
+            # A fresh cache only has the stored row to go on
+            from_table = await PriceCache(client, ttl=timedelta(0), stale_ttl=timedelta(0)).get_prices([PRICED])
+            return first, during_outage, from_table
+        finally:
+            await client.close()
+            await stand_in.server.close()
+
+    first, during_outage, from_table = asyncio.run(scenario())
+    assert first == during_outage == from_table == {PRICED: (price, price)}
+    assert stored_price(PRICED) == (price, price)
+
+def test_empty_order_book_is_a_miss():
+    stand_in = StandInBuff()
+    stand_in.orders = []
+
+    async def scenario():
+        client = await stand_in.client()
+        try:
+            return await PriceCache(client).get_prices([UNPRICED])
+        finally:
+            await client.close()
+            await stand_in.server.close()
+
+    assert asyncio.run(scenario()) == {}
+    assert stored_price(UNPRICED) == (None, None)
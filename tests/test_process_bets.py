@@ -0,0 +1,61 @@
+import random
+from decimal import Decimal
+
+import database
+import game
+from betbook import RoundBook
+
+STAKES = [Decimal("0.10"), Decimal("0.50"), Decimal("0.30"), Decimal("0.70"), Decimal("0.01")]
+COLORS = [game.Results.RED, game.Results.BLACK, game.Results.GREEN]
+
+def play(round_id: str, result: int, bets: list[tuple[int, Decimal, str]]) -> RoundBook:
+    database.unit_of_work(database.create_round, round_id, result)
+    played = database.unit_of_work(database.get_round_by_id, round_id)
+    book = RoundBook(played.id, played.result_color)
+    for gambler_id, amount, bet_on in bets:
+        book.place(gambler_id, f"gambler{gambler_id}", amount, bet_on, Decimal("0"))
+    book.seal()
+    database.unit_of_work(database.create_bets, book)
+    return book
+
+def gamblers(gambler_ids) -> dict:
+    return database.unit_of_work(lambda: {gambler.id: (gambler.balance, gambler.total_wagered, gambler.xp)
+                                          for gambler in database.session.query(database.Gambler).filter(database.Gambler.id.in_(gambler_ids))})
+
+def stats(gambler_ids) -> dict:
+    return database.unit_of_work(lambda: {row.gambler_id: (row.red_bets, row.green_bets, row.net_profit, row.current_streak)
+                                          for row in database.session.query(database.GamblerStats).filter(database.GamblerStats.gambler_id.in_(gambler_ids))})
+
+def test_many_small_stakes_settle_to_the_cent():
+    rng = random.Random(20)
+    gambler_ids = range(2001, 2031)
+    for gambler_id in gambler_ids:
+        database.unit_of_work(database.create_gambler, gambler_id, f"gambler{gambler_id}", balance=100)
+    expected = {gambler_id: [Decimal("100.00"), Decimal("0.00"), 0] for gambler_id in gambler_ids}
+
+    for round_num in range(60):
+        bets = [(gambler_id, rng.choice(STAKES), rng.choice(COLORS)) for gambler_id in gambler_ids]
+        book = play(f"cents-{round_num}", rng.randint(0, 14), bets)
+        assert database.unit_of_work(database.process_bets, book.round_id)
+        for gambler_id, amount, bet_on in bets:
+            won = bet_on == book.result_color
+            expected[gambler_id][0] += -amount + (amount * game.MULTIPLIERS[bet_on] if won else 0)
+            expected[gambler_id][1] += amount
+            expected[gambler_id][2] += int(amount * 100) * game.XP_PER_DOLLAR // 100
+
+    assert gamblers(gambler_ids) == {gambler_id: tuple(values) for gambler_id, values in expected.items()}
+
+def test_settling_a_round_twice_is_a_no_op():
+    gambler_ids = [2041, 2042]
+    for gambler_id in gambler_ids:
+        database.unit_of_work(database.create_gambler, gambler_id, f"gambler{gambler_id}", balance=10)
+    book = play("settled-twice", 1, [(2041, Decimal("0.50"), game.Results.RED), (2042, Decimal("0.30"), game.Results.GREEN)])
+
+    assert database.unit_of_work(database.process_bets, book.round_id) is True
+    settled = gamblers(gambler_ids)
+    settled_stats = stats(gambler_ids)
+    assert settled == {2041: (Decimal("10.50"), Decimal("0.50"), 50), 2042: (Decimal("9.70"), Decimal("0.30"), 30)}
+
+    assert database.unit_of_work(database.process_bets, book.round_id) is False
+    assert gamblers(gambler_ids) == settled
+    assert stats(gambler_ids) == settled_stats
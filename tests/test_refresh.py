@@ -0,0 +1,45 @@
+import asyncio
+
+import aiohttp
+import pytest
+
+import database
+import inventory
+from money import to_money
+
+GAMBLER_ID = 1301
+TRADE_URL = "https://steamcommunity.com/tradeoffer/new/?partner=1301&token=test"
+
+def item(asset_id: str, buff_price) -> dict:
+    return {"asset_id": asset_id, "name": "Sticker | Non-Veg", "exterior": None, "is_tradable": True, "tradable_date": None,
+            "inspect_link": None, "image_url": "", "buff_price": buff_price}
+
+class FakeCache():
+    async def get_prices(self, names) -> dict:
+        return {name: (2.0, 1.0) for name in names}
+
+def test_failed_page_fails_the_job_and_keeps_the_items(monkeypatch):
+    database.unit_of_work(database.create_gambler, GAMBLER_ID, "refresh")
+    database.unit_of_work(database.set_trade_url, GAMBLER_ID, TRADE_URL)
+    database.unit_of_work(database.save_user_items, GAMBLER_ID, [item("r1", to_money(1)), item("r2", to_money(1))])
+
+    async def stream_inventory(steam_id, page_size):
+        yield [item("r1", None)]
+        raise aiohttp.ClientConnectionError("connection reset")
+    monkeypatch.setattr(inventory, "stream_inventory", stream_inventory)
+
+    async def scenario():
+        queue = inventory.RefreshQueue(workers=1, refresh=lambda gambler_id, progress: inventory.refresh_user_items(gambler_id, FakeCache(), progress))
+        job = queue.submit(GAMBLER_ID)
+        try:
+            with pytest.raises(aiohttp.ClientConnectionError):
+                await job.wait()
+            assert (queue.completed, queue.failed) == (0, 1)
+            assert job.stage == "Failed."
+        finally:
+            await queue.close()
+    asyncio.run(scenario())
+
+    # r2 was on a page that was never fetched, it is not deleted
+    items = database.unit_of_work(lambda: {row.asset_id: row.buff_price for row in database.session.query(database.Item).filter_by(gambler_id=GAMBLER_ID)})
+    assert sorted(items) == ["r1", "r2"]
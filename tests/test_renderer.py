@@ -0,0 +1,46 @@
+import asyncio
+
+from discord import Embed
+
+from renderer import RenderScheduler
+
+class FlakyMessage():
+    """Fails its first `failures` edits, then records what every edit sent."""
+    id = 1
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.sent = []
+
+    async def edit(self, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("connection reset")
+        self.sent.append(kwargs)
+
+def test_view_of_a_failed_edit_goes_with_the_next_one():
+    async def scenario():
+        embed = Embed()
+        embed.add_field(name="Time", value="")
+        message = FlakyMessage(failures=1)
+        scheduler = RenderScheduler(message, embed, view="open", interval=0)
+        scheduler.start()
+        scheduler.set_view("closed")
+        await scheduler.flush()
+        assert message.sent == []
+        scheduler.set_field(0, "Time", "Closed")
+        await scheduler.flush()
+        await scheduler.close()
+        return message.sent
+
+    sent = asyncio.run(scenario())
+    assert [kwargs.get("view") for kwargs in sent] == ["closed"]
+
+def test_flush_returns_when_the_scheduler_stopped():
+    async def scenario():
+        scheduler = RenderScheduler(FlakyMessage(failures=0), Embed(), interval=0)
+        scheduler.start()
+        await scheduler.close()
+        scheduler.set_color(0x123456)
+        await asyncio.wait_for(scheduler.flush(), 1)
+    asyncio.run(scenario())
@@ -0,0 +1,27 @@
+import game
+from shard import ROUND_SLACK, ShardCoordinator, TableClock
+
+class FakeTable():
+    def __init__(self, channel_id: int, betting_duration: int, pause: float):
+        self.channel_id = channel_id
+        self.betting_duration = betting_duration
+        self.pause = pause
+
+def test_clock_follows_the_betting_period():
+    table = FakeTable(42, 10, 5)
+    clock = TableClock(table)
+    assert clock.period == 10 + game.ANIMATION_DURATION + 5 + ROUND_SLACK
+    phase = clock.offset / clock.period
+
+    table.betting_duration = 30
+    assert clock.period == 30 + game.ANIMATION_DURATION + 5 + ROUND_SLACK
+    assert abs(clock.offset / clock.period - phase) < 1e-9  # The table keeps its place in the slot
+    slot = clock.slot_at(1_700_000_000)
+    assert clock.start_of(slot) <= 1_700_000_000 < clock.start_of(slot + 1)
+    assert clock.start_of(slot + 1) - clock.start_of(slot) == clock.period
+
+def test_new_betting_period_survives_a_take_over():
+    coordinator = ShardCoordinator(manager=None, store=None, shard_id="test", config="42:10:5,43")
+    coordinator.set_betting_duration(42, 25)
+    coordinator.set_betting_duration(44, 25)  # Not a table of ROULETTE_TABLES
+    assert coordinator.tables == {42: {"channel_id": 42, "betting_duration": 25, "pause": 5.0}, 43: {"channel_id": 43}}